@@ -27,7 +27,8 @@ setup(
     ],
     python_requires=">=3.7",
     install_requires=[
-        "pydantic>=1.8.0,<2.0.0",
+        "pydantic>=1.10.0,<2.0.0",
+        "orjson>=3.8.0",
         
         # Add other dependencies here
     ],
@@ -1,3 +1,16 @@
-from .core.agent import AutonomaAgent
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .core.agent import AutonomaAgent
 
 __all__ = ["AutonomaAgent"]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported on first access (PEP 562) so importing the package does not load every agent.
+    if name == "AutonomaAgent":
+        from .core.agent import AutonomaAgent
+
+        globals()[name] = AutonomaAgent
+        return AutonomaAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
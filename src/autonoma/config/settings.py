@@ -5,3 +5,8 @@ load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OUTPUT_DIR = "output"
+# Sample LLM responses at temperature 0 and cache them on disk across runs.
+DETERMINISTIC = os.getenv("AUTONOMA_DETERMINISTIC", "").lower() in ("1", "true", "yes")
+# Cache sampled LLM responses and serve them for similar, not only identical, prompts; ignored
+# when DETERMINISTIC is set.
+SEMANTIC_CACHE = os.getenv("AUTONOMA_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
@@ -0,0 +1,26 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .agent import AutonomaAgent
+    from .planner import PlannerAgent
+    from .coder import CoderAgent
+    from .tester import Tester
+
+# Agents are imported on first access (PEP 562) so importing the package stays cheap.
+_LAZY = {
+    "AutonomaAgent": ".agent",
+    "PlannerAgent": ".planner",
+    "CoderAgent": ".coder",
+    "Tester": ".tester",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,6 +1,9 @@
 """Core agent module for the Autonoma package."""
 
-from typing import List, Any
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, List, TypeVar
 from autonoma.models import (
     Project,
     Agent,
@@ -16,15 +19,41 @@ from autonoma.models import (
 from .planner import PlannerAgent
 from .coder import CoderAgent
 from .tester import Tester
-from autonoma.utils.file_operations import store_results, get_modified_files, get_new_files
+from autonoma.utils.file_operations import store_results_in_background, split_files
 from autonoma.utils.reflection import Reflector
 
+T = TypeVar("T")
+
+
+async def _run_sync(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking callable in the default executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args))
+
+
+def _run_coroutine(coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    When called from a thread with a running event loop, e.g. in Jupyter, the coroutine runs in
+    its own event loop on another thread, since the running loop cannot be blocked on.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
 
 class AutonomaAgent:
     """
     Main agent class for the Autonoma system.
 
     This class orchestrates the entire process of code modification and analysis.
+
+    Results are assembled with `construct()`, which skips validation: their fields come from
+    models that were already validated where LLM output entered the system.
     """
 
     def __init__(self, llm_interface: Any):
@@ -44,6 +73,19 @@ class AutonomaAgent:
         """
         Process a query against the given codebase.
 
+        Args:
+            query: The query to process.
+            code_base: The codebase to process the query against.
+
+        Returns:
+            A FinalResult object containing the results of the query processing.
+        """
+        return _run_coroutine(self.aprocess_query(query, code_base))
+
+    async def aprocess_query(self, query: str, code_base: List[CodeFile]) -> FinalResult:
+        """
+        Process a query against the given codebase, running the agents concurrently.
+
         Args:
             query: The query to process.
             code_base: The codebase to process the query against.
@@ -53,12 +95,14 @@ class AutonomaAgent:
         """
         self.reflector.reflect(f"Processing query: {query}")
 
-        project = self.planner_agent.create_query_plan(
-            PlanRequest(query=query, code_base=code_base)
+        project = await _run_sync(
+            self.planner_agent.create_query_plan, PlanRequest(query=query, code_base=code_base)
         )
-        project_result = self.execute_project(project, code_base)
+        project_result = await self.aexecute_project(project, code_base)
         final_result = self.compile_results(project_result)
-        store_results(final_result)
+        # The files are written in the background; await final_result.persisted() to join them.
+        final_result._persist_future = store_results_in_background(final_result)
+        self.reflector.flush()
 
         return final_result
 
@@ -73,23 +117,39 @@ class AutonomaAgent:
         Returns:
             A ProjectResult object containing the results of the project execution.
         """
-        agent_results: List[AgentResult] = []
+        return _run_coroutine(self.aexecute_project(project, code_base))
 
-        for agent in project.agents:
-            agent_result = self.execute_agent_tasks(agent, code_base)
-            agent_results.append(agent_result)
+    async def aexecute_project(self, project: Project, code_base: List[CodeFile]) -> ProjectResult:
+        """
+        Execute a project against the given codebase, running the agents concurrently.
+
+        Args:
+            project: The project to execute.
+            code_base: The codebase to execute the project against.
 
-        modified_files = get_modified_files(agent_results)
+        Returns:
+            A ProjectResult object containing the results of the project execution.
+        """
+        agent_results: List[AgentResult] = list(
+            await asyncio.gather(
+                *(self.aexecute_agent_tasks(agent, code_base) for agent in project.agents)
+            )
+        )
 
-        return ProjectResult(
+        modified_files, new_files = split_files(agent_results)
+        # Keep the partitions disjoint: a path reported as new is not also listed as unchanged.
+        changed_paths = modified_files.keys() | new_files.keys()
+
+        return ProjectResult.construct(
             project=project,
             agent_results=agent_results,
             modified_files=modified_files,
-            new_files=get_new_files(agent_results),
+            new_files=new_files,
             unchanged_files={
-                file.path: file.content for file in code_base if file.path not in modified_files
+                file.path: file.content for file in code_base if file.path not in changed_paths
             },
-            thought_process=self.reflector.thought_process,
+            # construct() does not copy, and the reflector keeps recording for later queries.
+            thought_process=list(self.reflector.thought_process),
         )
 
     def execute_agent_tasks(self, agent: Agent, codebase: List[CodeFile]) -> AgentResult:
@@ -110,7 +170,29 @@ class AutonomaAgent:
             task_result = self.execute_task(task, agent, codebase)
             task_results.append(task_result)
 
-        return AgentResult(agent_name=agent.name, task_results=task_results)
+        return AgentResult.construct(agent_name=agent.name, task_results=task_results)
+
+    async def aexecute_agent_tasks(self, agent: Agent, codebase: List[CodeFile]) -> AgentResult:
+        """
+        Execute the tasks of a single agent without blocking the event loop.
+
+        Tasks are executed sequentially, since later tasks of an agent may depend on earlier ones.
+
+        Args:
+            agent: The agent whose tasks are to be executed.
+            codebase: The codebase to execute the tasks against.
+
+        Returns:
+            An AgentResult object containing the results of the agent's task executions.
+        """
+        self.reflector.reflect(f"Executing tasks for agent: {agent.name}")
+        task_results: List[TaskResult] = []
+
+        for task in agent.tasks:
+            task_result = await self.aexecute_task(task, agent, codebase)
+            task_results.append(task_result)
+
+        return AgentResult.construct(agent_name=agent.name, task_results=task_results)
 
     def execute_task(self, task: Task, agent: Agent, codebase: List[CodeFile]) -> TaskResult:
         """
@@ -130,6 +212,24 @@ class AutonomaAgent:
         else:
             return self.execute_llm_task(task)
 
+    async def aexecute_task(self, task: Task, agent: Agent, codebase: List[CodeFile]) -> TaskResult:
+        """
+        Execute a single task without blocking the event loop.
+
+        Args:
+            task: The task to execute.
+            agent: The agent executing the task.
+            codebase: The codebase to execute the task against.
+
+        Returns:
+            A TaskResult object containing the results of the task execution.
+        """
+        self.reflector.reflect(f"Executing task: {task.description}")
+        if task.task_type == TaskType.CODE_IMPLEMENTATION:
+            return await _run_sync(self.modify_code, task, agent, codebase)
+        else:
+            return await self.aexecute_llm_task(task)
+
     def modify_code(self, task: Task, agent: Agent, codebase: List[CodeFile]) -> TaskResult:
         """
         Modify code based on the given task.
@@ -147,9 +247,13 @@ class AutonomaAgent:
 
         max_iterations = 3
         iteration_count = 0
+        # The original codebase does not change between iterations, so map it out only once.
+        base_codebase = {file.path: file.content for file in codebase}
 
         while iteration_count < max_iterations:
-            unsuccessful_tests, successful_tests = self.tester.run_tests(modified_code, codebase)
+            unsuccessful_tests, successful_tests = self.tester.run_tests(
+                modified_code, base_codebase
+            )
 
             if not unsuccessful_tests:
                 self.reflector.reflect("All tests passed successfully.")
@@ -159,10 +263,9 @@ class AutonomaAgent:
                 f"Iteration {iteration_count + 1}: {len(unsuccessful_tests)} tests failed. Attempting to fix..."
             )
 
-            for test in unsuccessful_tests:
-                modified_code = self.coder_agent.modify_code_based_on_test(
-                    modified_code, test.test_code, test.message, task
-                )
+            modified_code = self.coder_agent.modify_code_based_on_tests(
+                modified_code, unsuccessful_tests, task
+            )
 
             iteration_count += 1
 
@@ -173,7 +276,7 @@ class AutonomaAgent:
             file_change.path: file_change.code for file_change in modified_code.code_changes
         }
 
-        return TaskResult(
+        return TaskResult.construct(
             task_id=task.id,
             success=len(unsuccessful_tests) == 0,
             output="Code modification complete"
@@ -195,7 +298,24 @@ class AutonomaAgent:
         """
         self.reflector.reflect(f"Executing LLM task: {task.description}")
         result = self.llm_interface.generate(task.prompt_llm)
-        return TaskResult(task_id=task.id, success=True, output=result)
+        return TaskResult.construct(task_id=task.id, success=True, output=result)
+
+    async def aexecute_llm_task(self, task: Task) -> TaskResult:
+        """
+        Execute a task using the language model without blocking the event loop.
+
+        Args:
+            task: The task to be executed by the language model.
+
+        Returns:
+            A TaskResult object containing the results of the language model execution.
+        """
+        self.reflector.reflect(f"Executing LLM task: {task.description}")
+        if hasattr(self.llm_interface, "agenerate"):
+            result = await self.llm_interface.agenerate(task.prompt_llm)
+        else:
+            result = await _run_sync(self.llm_interface.generate, task.prompt_llm)
+        return TaskResult.construct(task_id=task.id, success=True, output=result)
 
     def compile_results(self, project_result: ProjectResult) -> FinalResult:
         """
@@ -209,4 +329,6 @@ class AutonomaAgent:
         """
         self.reflector.reflect("Compiling final results")
         output_directory = "output"
-        return FinalResult(project_result=project_result, output_directory=output_directory)
+        return FinalResult.construct(
+            project_result=project_result, output_directory=output_directory
+        )
@@ -1,7 +1,78 @@
 """CoderAgent module for the Autonoma package."""
 
-from typing import Any
-from autonoma.models import Agent, Task, GeneratedCode
+import threading
+from collections import OrderedDict
+from typing import Any, List, Tuple
+from autonoma.models import Agent, Task, GeneratedCode, TestResult
+from autonoma.utils.llm_interface import response_format_kwargs
+
+# The prompt prefixes below are sent verbatim ahead of any per-call content so that providers can
+# reuse their cached prefix across calls. They must not be formatted or edited per call.
+_CODER_AGENT_SYSTEM_PREFIX = """Act as the following agent:
+"""
+
+_CODER_USER_PREFIX = """Write Python code to accomplish the task described at the end of this message.
+Return only the code, without any explanations.
+Use JSON return format:
+{
+    "code_changes": [
+        {"code": "code without explanations", "path": "path of the code"}
+    ]
+}
+"""
+
+_CODER_SYSTEM_PROMPT = """You are an expert Python developer tasked with modifying code to pass tests.
+Focus on making minimal necessary changes to fix the failing tests.
+Ensure your modifications maintain the overall structure and intent of the original code.
+If the test is already passing, return the original code unchanged.
+Ensure you mock all the imports.
+"""
+
+_CODER_FIX_ALL_PREFIX = """Modify the Python code given at the end of this message to pass all of the given tests.
+Analyze every test result and modify the code to make all the tests pass at once.
+Return only the modified code, without any explanations.
+Use JSON return format:
+{
+    "code_changes": [
+        {"code": "modified code without explanations", "path": "path to the code"}
+    ]
+}
+"""
+
+# Templates for the per-call content appended to the prefixes above.
+_CODER_TASK_TEMPLATE = """
+Task:
+{description}
+
+Changes need to be made on the following code:
+{relevant_code}
+"""
+
+_CODER_SUMMARY_TEMPLATE = """
+The following files are summarized for reference and must not be changed:
+{summary}
+"""
+
+_CODER_FIX_ALL_TEMPLATE = """
+Task Description:
+{description}
+
+Current code:
+{code}
+"""
+
+_CODER_FAILING_TEST_TEMPLATE = """
+Test {number} code:
+{test}
+
+Test {number} result:
+{test_result}
+"""
+
+# The static prefixes of the user prompts, which callers such as the LLM cache can rely on.
+PROMPT_PREFIXES = (_CODER_USER_PREFIX, _CODER_FIX_ALL_PREFIX)
+
+_AGENT_JSON_CACHE_SIZE = 32
 
 
 class CoderAgent:
@@ -17,6 +88,11 @@ class CoderAgent:
             llm_interface: An interface to the language model for generating responses.
         """
         self.llm_interface = llm_interface
+        # The most recently serialized agents keyed by id; the agent is kept alongside so the id
+        # cannot be reused while it is cached.
+        self._agent_json: "OrderedDict[int, Tuple[Agent, str]]" = OrderedDict()
+        # Agents run their tasks on several threads at once.
+        self._agent_json_lock = threading.Lock()
 
     def generate_code(self, task: Task, agent: Agent) -> GeneratedCode:
         """
@@ -29,74 +105,90 @@ class CoderAgent:
         Returns:
             A GeneratedCode object containing the generated code changes.
         """
-        user_prompt = f"""
-        Write Python code to accomplish the following task:
-        {task.description}
-        Return only the code, without any explanations.
-        Use JSON return format:
-        {{
-            "code_changes": [
-                {{"code": "code without explanations", "path": "path of the code"}}
-            ]
-        }}
-        Changes need to be made on the following code:
-        {task.relevant_code}
-        """
-
-        system_prompt = f"""
-        Act as the following agent:
-        {agent.json()}
-        """
-        response = self.llm_interface.generate(user_prompt=user_prompt, system_prompt=system_prompt)
+        user_prompt, system_prompt = self._generation_prompts(task, agent)
+        response = self.llm_interface.generate(
+            user_prompt=user_prompt,
+            system_prompt=system_prompt,
+            **response_format_kwargs(self.llm_interface.generate, GeneratedCode),
+        )
         return GeneratedCode.parse_raw(response)
 
-    def modify_code_based_on_test(
-        self, code: GeneratedCode, test: str, test_result: str, task: Task
-    ) -> GeneratedCode:
+    def _generation_prompts(self, task: Task, agent: Agent) -> Tuple[str, str]:
         """
-        Modify code based on test results.
+        Build the user and system prompts for generating code for a task.
 
         Args:
-            code: The current code represented as a GeneratedCode object.
-            test: The test code that failed.
-            test_result: The result of the failed test.
-            task: The original task containing the description.
+            task: The task containing code modification instructions.
+            agent: The agent requesting the code generation.
 
         Returns:
-            A GeneratedCode object containing the modified code changes.
+            A tuple of the user prompt and the system prompt.
         """
-        user_prompt = f"""
-        Modify the following Python code to pass the given test:
-
-        Current code:
-        {code.json()}
-
-        Test code:
-        {test}
+        user_prompt = _CODER_USER_PREFIX + _CODER_TASK_TEMPLATE.format(
+            description=task.description, relevant_code=task.relevant_code
+        )
+        if task.relevant_code_summary:
+            # Reference files are only sent as signatures and docstrings to save input tokens.
+            user_prompt += _CODER_SUMMARY_TEMPLATE.format(summary=task.relevant_code_summary)
+        system_prompt = _CODER_AGENT_SYSTEM_PREFIX + self._serialize_agent(agent)
+        return user_prompt, system_prompt
+
+    def _serialize_agent(self, agent: Agent) -> str:
+        """
+        Serialize an agent to JSON, reusing the result for recently serialized agents.
 
-        Test result:
-        {test_result}
+        Agents are not modified while a project runs, so every agent is serialized only once.
 
-        Task Description:
-        {task.description}
+        Args:
+            agent: The agent to serialize.
 
-        Analyze the test result and modify the code to make it pass the test.
-        Return only the modified code, without any explanations.
-        Use JSON return format:
-        {{
-            "code_changes": [
-                {{"code": "modified code without explanations", "path": "path to the code"}}
-            ]
-        }}
+        Returns:
+            The JSON representation of the agent.
         """
-
-        system_prompt = """
-        You are an expert Python developer tasked with modifying code to pass tests.
-        Focus on making minimal necessary changes to fix the failing tests.
-        Ensure your modifications maintain the overall structure and intent of the original code.
-        If the test is already passing, return the original code unchanged.
-        Ensure you mock all the imports.
+        with self._agent_json_lock:
+            cached = self._agent_json.get(id(agent))
+            if cached is not None and cached[0] is agent:
+                self._agent_json.move_to_end(id(agent))
+                return cached[1]
+
+        agent_json = agent.json()
+        with self._agent_json_lock:
+            self._agent_json[id(agent)] = (agent, agent_json)
+            if len(self._agent_json) > _AGENT_JSON_CACHE_SIZE:
+                self._agent_json.popitem(last=False)
+        return agent_json
+
+    def modify_code_based_on_tests(
+        self,
+        code: GeneratedCode,
+        failing_tests: List[TestResult],
+        task: Task,
+    ) -> GeneratedCode:
         """
+        Modify code based on the results of several failing tests with a single request.
 
-        response = self.llm_interface.generate(user_prompt=user_prompt, system_prompt=system_prompt)
+        Args:
+            code: The current code represented as a GeneratedCode object.
+            failing_tests: The results of the failed tests.
+            task: The original task containing the description.
+
+        Returns:
+            A GeneratedCode object containing the modified code changes.
+        """
+        user_prompt = _CODER_FIX_ALL_PREFIX + _CODER_FIX_ALL_TEMPLATE.format(
+            description=task.description, code=code.json()
+        )
+        user_prompt += "".join(
+            _CODER_FAILING_TEST_TEMPLATE.format(
+                number=number, test=test.test_code, test_result=test.message
+            )
+            for number, test in enumerate(failing_tests, start=1)
+        )
+        system_prompt = _CODER_SYSTEM_PROMPT
+
+        response = self.llm_interface.generate(
+            user_prompt=user_prompt,
+            system_prompt=system_prompt,
+            **response_format_kwargs(self.llm_interface.generate, GeneratedCode),
+        )
         return GeneratedCode.parse_raw(response)
@@ -1,8 +1,73 @@
 """PlannerAgent module for the Autonoma package."""
 
-import json
+import orjson
 from typing import List, Dict
 from autonoma.models import Project, TaskType, CodeFile, PlanRequest
+from autonoma.utils.code_summary import summarize_code
+from autonoma.utils.llm_interface import response_format_kwargs
+
+# Sent verbatim ahead of the query and codebase structure so that providers can reuse their cached
+# prefix across calls. It must not be formatted or edited per call.
+_PLANNER_PREFIX = """You are an AI assistant specializing in software development and code modification.
+Your task is to create a plan to address a query about modifying a specific codebase.
+The query and the codebase structure are given at the end of this message.
+
+Create a plan to address the query. The plan should consist of a series of code modification tasks that can be executed sequentially.
+For each task, specify only the files that are absolutely necessary for that specific modification.
+
+Provide your response as a JSON object with the following structure:
+
+{
+  "agents": [
+    {
+      "name": "Code Implementer",
+      "role": "Agent's specialized role",
+      "goal": "The goal of this agent",
+      "tasks": [
+        {
+          "id": "unique_task_id",
+          "description": "Short task description",
+          "task_type": "code_implementation or code_analysis",
+          "execution_type": "llm_call or code_execution",
+          "file_paths": ["List of file paths modified or created by this task"],
+          "context_paths": ["List of file paths only read for reference by this task"],
+          "estimated_complexity": "Low/Medium/High",
+          "prompt_llm": "The prompt for the LLM if llm_call, or an empty string"
+        },
+        ...
+      ]
+    }
+  ]
+}
+
+Ensure that:
+1. Tasks flow logically from one to the next, addressing all aspects of the query.
+2. Each task includes specific instructions for code modification.
+3. Only include file paths that are absolutely necessary for each task.
+4. If a new file needs to be created, include its intended path in the file_paths list.
+5. Files the task only needs to read, such as modules whose functions it calls, go in context_paths.
+
+Analyze the query and codebase, then provide the JSON output as specified above.
+
+Don't include a tester agent, as testing will be done in a separate query.
+Don't include analysis tasks only, always refactor something.
+Don't use a file in multiple tasks, be extremely critical on the amount of tasks, the fewer tasks the better.
+Only use a file once over all the tasks.
+"""
+
+# Template for the per-call content appended to the prefix above.
+_PLANNER_QUERY_TEMPLATE = """
+
+Query: {query}
+
+Codebase:
+{codebase_structure}
+"""
+
+PROMPT_PREFIXES = (_PLANNER_PREFIX,)
+
+# Task fields filled in while executing the plan are left out of the response schema.
+_PLAN_EXCLUDED_FIELDS = ("status", "relevant_code", "relevant_code_summary")
 
 
 class PlannerAgent:
@@ -28,7 +93,14 @@ class PlannerAgent:
             A Project object containing the created query plan.
         """
         prompt = self._generate_prompt(plan_request)
-        plan_dict = json.loads(self.llm_interface.generate(prompt))
+        plan_dict = orjson.loads(
+            self.llm_interface.generate(
+                prompt,
+                **response_format_kwargs(
+                    self.llm_interface.generate, Project, _PLAN_EXCLUDED_FIELDS
+                ),
+            )
+        )
 
         # Create a Project object
         project = Project(**plan_dict)
@@ -48,62 +120,14 @@ class PlannerAgent:
         Returns:
             A string containing the generated prompt.
         """
-        codebase_structure = json.dumps(
+        codebase_structure = orjson.dumps(
             {file.path: f"<code content of {file.path}>" for file in plan_request.code_base},
-            indent=2,
-        )
+            option=orjson.OPT_INDENT_2,
+        ).decode()
 
-        return f"""
-        You are an AI assistant specializing in software development and code modification. 
-        Your task is to create a plan to address a query about modifying a specific codebase.
-
-        Query: {plan_request.query}
-
-        Codebase structure:
-        {codebase_structure}
-
-        Create a plan to address the query. The plan should consist of a series of code modification tasks that can be executed sequentially.
-        For each task, specify only the files that are absolutely necessary for that specific modification.
-
-        Provide your response as a JSON object with the following structure:
-
-        {{
-          "agents": [
-            {{
-              "name": "Code Implementer",
-              "role": "Agent's specialized role",
-              "goal": "The goal of this agent",
-              "tasks": [
-                {{
-                  "id": "unique_task_id",
-                  "description": "Short task description",
-                  "task_type": "code_implementation or documentation",
-                  "status": "not_started",
-                  "execution_type": "llm_call or code_execution",
-                  "file_paths": ["List of file paths needed for this tasks"],
-                  "estimated_complexity": "Low/Medium/High",
-                  "cmd": "Command to execute the code if code_execution, or null",
-                  "prompt_llm": "The prompt for the LLM if llm_call, or null"
-                }},
-                ...
-              ]
-            }}
-          ]
-        }}
-
-        Ensure that:
-        1. Tasks flow logically from one to the next, addressing all aspects of the query.
-        2. Each task includes specific instructions for code modification.
-        3. Only include file paths that are absolutely necessary for each task.
-        4. If a new file needs to be created, include its intended path in the file_paths list.
-
-        Analyze the query and codebase, then provide the JSON output as specified above.
-
-        Don't include a tester agent, as testing will be done in a separate query.
-        Don't include analysis tasks only, always refactor something.
-        Don't use a file in multiple tasks, be extremely critical on the amount of tasks, the fewer tasks the better.
-        Only use a file once over all the tasks.
-        """
+        return _PLANNER_PREFIX + _PLANNER_QUERY_TEMPLATE.format(
+            query=plan_request.query, codebase_structure=codebase_structure
+        )
 
     def _validate_and_extract_code(self, project: Project, codebase: List[CodeFile]):
         """
@@ -113,30 +137,18 @@ class PlannerAgent:
             project: The Project object to validate and update.
             codebase: The list of CodeFile objects representing the codebase.
         """
+        code_by_path = {file.path: file.content for file in codebase}
         for agent in project.agents:
             for task in agent.tasks:
                 if task.file_paths:
-                    task.relevant_code = {
-                        path: self._extract_code(codebase, path) for path in task.file_paths
+                    task.relevant_code = {path: code_by_path.get(path) for path in task.file_paths}
+                if task.context_paths:
+                    task.relevant_code_summary = {
+                        path: summarize_code(code_by_path[path])
+                        for path in task.context_paths
+                        if path in code_by_path and path not in task.relevant_code
                     }
 
-    @staticmethod
-    def _extract_code(codebase: List[CodeFile], path: str) -> str:
-        """
-        Extract code from the codebase for a given file path.
-
-        Args:
-            codebase: The list of CodeFile objects representing the codebase.
-            path: The path of the file to extract code from.
-
-        Returns:
-            The content of the file if found, None otherwise.
-        """
-        for file in codebase:
-            if file.path == path:
-                return file.content
-        return None
-
     def get_modified_files(self, project: Project) -> Dict[str, str]:
         """
         Get all modified files from the project.
@@ -1,50 +1,102 @@
 """Tester module for the Autonoma package."""
 
-import json
-from typing import List, Tuple
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 from pydantic import BaseModel
 from ..utils.code_executor import CodeExecutor
+from ..utils.llm_interface import response_format_kwargs
 from autonoma.models import CodeFile, TestCodeResponse, TestResult, CodeChange, GeneratedCode
 
+# Sent verbatim ahead of the code under test so that providers can reuse their cached prefix across
+# calls. It must not be formatted or edited per call.
+_TESTER_PREFIX = """Generate unit tests to verify the correctness of the Python code given at the end of this message.
+The tests should be self-contained and not rely on importing from external modules.
+Include the original function in the test code and use it directly.
+
+Return a JSON object with the following structure:
+{
+    "tests": [
+        {
+            "test_code": "The generated test code as a string",
+            "test_path": "specific file for which the tests are",
+            "original_code_path": "the path of the original file"
+        }
+    ]
+}
+
+Ensure that the test code:
+1. Defines any necessary functions from the original code
+2. Includes import statements for unittest
+3. Defines a test class that inherits from unittest.TestCase
+4. Includes at least one test method
+5. Has a block to run the tests if the script is run directly
+6. Writes all the tests for a file separately
+
+Do not use any import statements other than for the unittest module.
+
+Python code:
+"""
+
+PROMPT_PREFIXES = (_TESTER_PREFIX,)
+
 
 class Tester:
     """Tester class for running tests on modified code."""
 
-    def __init__(self, llm_interface):
+    def __init__(self, llm_interface, max_workers: int = 8):
         """
         Initialize the Tester.
 
         Args:
             llm_interface: An interface to the language model for generating test code.
+            max_workers: The maximum number of tests to execute concurrently.
         """
         self.llm_interface = llm_interface
+        self.max_workers = max_workers
         self.code_executor = CodeExecutor()
 
     def run_tests(
-        self, modified_code: "GeneratedCode", codebase: List[CodeFile]
+        self, modified_code: "GeneratedCode", codebase: Union[List[CodeFile], Dict[str, str]]
     ) -> Tuple[List[TestResult], List[TestResult]]:
         """
         Run tests on the modified code.
 
         Args:
             modified_code: The modified code to test.
-            codebase: The entire codebase.
+            codebase: The entire codebase, either as CodeFile objects or as a mapping of file
+                paths to contents. Callers testing repeatedly against the same codebase can build
+                the mapping once and pass it in; it is not modified.
 
         Returns:
             A tuple containing lists of unsuccessful and successful test results.
         """
         test_code_response = self.generate_test_code(modified_code)
 
-        unsuccessful_tests, successful_tests = [], []
-        for test_code in test_code_response.tests:
+        tests = test_code_response.tests
+        if isinstance(codebase, dict):
+            updated_codebase = dict(codebase)
+        else:
             updated_codebase = {file.path: file.content for file in codebase}
-            for file_change in modified_code.code_changes:
-                updated_codebase[file_change.path] = file_change.code
+        for file_change in modified_code.code_changes:
+            updated_codebase[file_change.path] = file_change.code
 
-            full_code = test_code.test_code
-            result = self.code_executor.run(full_code, updated_codebase)
+        unsuccessful_tests, successful_tests = [], []
+        if not tests:
+            return unsuccessful_tests, successful_tests
+
+        # Tests are independent and mostly wait on their sandboxed process, so run them together.
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tests))) as executor:
+            results = list(
+                executor.map(
+                    lambda test_code: self.code_executor.run(test_code.test_code, updated_codebase),
+                    tests,
+                )
+            )
 
-            test_result = TestResult(
+        for test_code, result in zip(tests, results):
+            # The fields come from validated models, so the result is built without revalidation.
+            test_result = TestResult.construct(
                 success=result.success,
                 message=result.output,
                 test_code=test_code.test_code,
@@ -68,40 +120,14 @@ class Tester:
         Returns:
             A TestCodeResponse object containing the generated test code.
         """
-        prompt = f"""
-        Given the following Python code:
-        
-        {json.dumps(code.dict(), default=lambda o: o.dict() if hasattr(o, 'dict') else str(o))}
-        
-        Generate unit tests to verify its correctness. The tests should be self-contained and not rely on importing from external modules.
-        Include the original function in the test code and use it directly.
-
-        Return a JSON object with the following structure:
-        {{
-            "tests": [
-                {{
-                    "test_code": "The generated test code as a string",
-                    "test_path": "specific file for which the tests are",
-                    "original_code_path": "the path of the original file"
-                }}
-            ]
-        }}
-
-        Ensure that the test code:
-        1. Defines any necessary functions from the original code
-        2. Includes import statements for unittest
-        3. Defines a test class that inherits from unittest.TestCase
-        4. Includes at least one test method
-        5. Has a block to run the tests if the script is run directly
-        6. Writes all the tests for a file separately
-
-        Do not use any import statements other than for the unittest module.
-        """
-        response = self.llm_interface.generate(prompt)
+        prompt = _TESTER_PREFIX + "\n" + code.json() + "\n"
+        response = self.llm_interface.generate(
+            prompt, **response_format_kwargs(self.llm_interface.generate, TestCodeResponse)
+        )
         try:
-            parsed_response = json.loads(response)
+            parsed_response = orjson.loads(response)
             return TestCodeResponse(**parsed_response)
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             raise ValueError(f"Failed to parse LLM response as JSON. Raw response: {response}")
 
 
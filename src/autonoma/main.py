@@ -1,13 +1,36 @@
-from autonoma import AutonomaAgent
-from autonoma.utils.llm_interface import LLMInterface
-from autonoma.config.settings import OPENAI_API_KEY
-import json
 import os
-from autonoma.models.agent import CodeFile
+import sys
 
 
 def main():
-    llm_interface = LLMInterface(os.getenv("OPENAI_API_KEY"))
+    # Imported here so that importing this module does not load the agents and models.
+    from autonoma import AutonomaAgent
+    from autonoma.utils.llm_interface import LLMInterface
+    from autonoma.utils.llm_cache import (
+        DEFAULT_CACHE_PATH,
+        CachingLLMInterface,
+        LLMCache,
+        load_sentence_embedder,
+    )
+    from autonoma.config.settings import DETERMINISTIC, OPENAI_API_KEY, SEMANTIC_CACHE
+    from autonoma.core import coder, planner, tester
+    from autonoma.models.agent import CodeFile
+
+    llm_interface = LLMInterface(os.getenv("OPENAI_API_KEY"), deterministic=DETERMINISTIC)
+    cache = None
+    if DETERMINISTIC:
+        # Replayed runs must get the exact responses of earlier runs, however old they are.
+        cache = LLMCache(ttl=None, path=DEFAULT_CACHE_PATH)
+    elif SEMANTIC_CACHE:
+        # Sampled responses are not cached by default, since a retried prompt should get a new
+        # answer rather than the one that already failed.
+        try:
+            cache = LLMCache(embedder=load_sentence_embedder())
+        except ImportError as e:
+            print(f"Semantic LLM cache disabled: {e}", file=sys.stderr)
+    if cache is not None:
+        prompt_prefixes = coder.PROMPT_PREFIXES + planner.PROMPT_PREFIXES + tester.PROMPT_PREFIXES
+        llm_interface = CachingLLMInterface(llm_interface, cache, prompt_prefixes=prompt_prefixes)
     autonoma = AutonomaAgent(llm_interface)
     query = "Refactor the functions in data_processor.py and utils.py to use higher-order functions like map, filter, and reduce instead of for loops"
     codebase = [
@@ -53,6 +76,8 @@ def filter_items(item):
     ]
 
     result = autonoma.process_query(query, [CodeFile(**file) for file in codebase])
+    if cache is not None:
+        print(f"LLM cache stats: {cache.stats}")
 
 
 if __name__ == "__main__":
@@ -1,28 +1,50 @@
-from .agent import Agent
-from .task import Task, TaskType, TaskStatus, ExecutionType
-from .project import Project
-from .code import CodeFile, CodeChange, GeneratedCode
-from .result import TestResult, TaskResult, AgentResult, ProjectResult, FinalResult, ExecutionResult
-from .request import PlanRequest
-from .test import TestCode, TestCodeResponse
+import importlib
+from typing import TYPE_CHECKING, Any
 
-__all__ = [
-    "Agent",
-    "Task",
-    "TaskType",
-    "TaskStatus",
-    "ExecutionType",
-    "Project",
-    "CodeFile",
-    "CodeChange",
-    "GeneratedCode",
-    "TestResult",
-    "TaskResult",
-    "AgentResult",
-    "ProjectResult",
-    "FinalResult",
-    "PlanRequest",
-    "ExcecutionResult",
-    "TestCode",
-    "TestCodeResponse",
-]
+if TYPE_CHECKING:
+    from .agent import Agent
+    from .task import Task, TaskType, TaskStatus, ExecutionType
+    from .project import Project
+    from .code import CodeFile, CodeChange, GeneratedCode
+    from .result import (
+        TestResult,
+        TaskResult,
+        AgentResult,
+        ProjectResult,
+        FinalResult,
+        ExecutionResult,
+    )
+    from .request import PlanRequest
+    from .test import TestCode, TestCodeResponse
+
+# Models are imported on first access (PEP 562) so importing the package stays cheap.
+_LAZY = {
+    "Agent": ".agent",
+    "Task": ".task",
+    "TaskType": ".task",
+    "TaskStatus": ".task",
+    "ExecutionType": ".task",
+    "Project": ".project",
+    "CodeFile": ".code",
+    "CodeChange": ".code",
+    "GeneratedCode": ".code",
+    "TestResult": ".result",
+    "TaskResult": ".result",
+    "AgentResult": ".result",
+    "ProjectResult": ".result",
+    "FinalResult": ".result",
+    "ExecutionResult": ".result",
+    "PlanRequest": ".request",
+    "TestCode": ".test",
+    "TestCodeResponse": ".test",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -29,7 +29,10 @@ class Task(BaseModel):
     execution_type: ExecutionType
     file_paths: list[str]
     estimated_complexity: str = Field(default="Medium")
+    prompt_llm: Optional[str] = None
     relevant_code: Optional[dict] = Field(default={})
+    context_paths: List[str] = Field(default_factory=list)
+    relevant_code_summary: Optional[dict] = Field(default={})
 
 
 class ExecutedTask(Task):
@@ -55,6 +58,9 @@ class Project(BaseModel):
 class ExecutedProject(Project):
     agents: List[ExecutedAgent] = Field(default_factory=list)
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class CodeFile(BaseModel):
     path: str
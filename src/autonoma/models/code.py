@@ -1,5 +1,15 @@
+import json
+import orjson
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Callable, List
+
+
+def _orjson_dumps(value: Any, *, default: Callable[[Any], Any], **dumps_kwargs: Any) -> str:
+    # orjson only supports two-space indentation; other json.dumps options fall back to json.
+    if not dumps_kwargs or dumps_kwargs == {"indent": 2}:
+        option = orjson.OPT_INDENT_2 if dumps_kwargs else None
+        return orjson.dumps(value, default=default, option=option).decode()
+    return json.dumps(value, default=default, **dumps_kwargs)
 
 
 class CodeFile(BaseModel):
@@ -20,3 +30,8 @@ class GeneratedCode(BaseModel):
     """Represents the generated code from the LLM."""
 
     code_changes: List[CodeChange] = Field(default_factory=list)
+
+    class Config:
+        # Generated code is serialized into prompts and parsed from responses on every iteration.
+        json_loads = orjson.loads
+        json_dumps = _orjson_dumps
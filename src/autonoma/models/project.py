@@ -7,3 +7,7 @@ class Project(BaseModel):
     """Represents a project in the Autonoma system."""
 
     agents: List[Agent] = Field(default_factory=list)
+
+    class Config:
+        # Reuse nested instances as they are instead of copying them into the parent model.
+        copy_on_model_validation = "none"
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+import asyncio
+from concurrent.futures import Future
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import List, Dict, Optional
 from .project import Project
 
@@ -11,6 +13,9 @@ class TestResult(BaseModel):
     test_code: str
     original_code_path: str
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class TaskResult(BaseModel):
     """Represents the result of a task execution."""
@@ -22,6 +27,9 @@ class TaskResult(BaseModel):
     new_files: Dict[str, str] = Field(default_factory=dict)
     test_results: Optional[List[TestResult]] = None
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class AgentResult(BaseModel):
     """Represents the result of an agent's execution."""
@@ -29,6 +37,9 @@ class AgentResult(BaseModel):
     agent_name: str
     task_results: List[TaskResult]
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class ProjectResult(BaseModel):
     """Represents the result of a project execution."""
@@ -40,12 +51,24 @@ class ProjectResult(BaseModel):
     unchanged_files: Dict[str, str]
     thought_process: List[str]
 
+    class Config:
+        copy_on_model_validation = "none"
+
 
 class FinalResult(BaseModel):
     """Represents the final result of the Autonoma execution."""
 
     project_result: ProjectResult
     output_directory: str
+    _persist_future: Optional[Future] = PrivateAttr(default=None)
+
+    class Config:
+        copy_on_model_validation = "none"
+
+    async def persisted(self) -> None:
+        """Wait until the results have been stored in the output directory."""
+        if self._persist_future is not None:
+            await asyncio.wrap_future(self._persist_future)
 
 
 class ExecutionResult(BaseModel):
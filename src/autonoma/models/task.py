@@ -33,3 +33,5 @@ class Task(BaseModel):
     cmd: Optional[str] = None
     prompt_llm: Optional[str] = None
     relevant_code: Dict[str, str] = Field(default_factory=dict)
+    context_paths: List[str] = Field(default_factory=list)
+    relevant_code_summary: Dict[str, str] = Field(default_factory=dict)
@@ -8,8 +8,15 @@ class TestCode(BaseModel):
     test_path: str
     original_code_path: str
 
+    class Config:
+        # Generated tests are only read once parsed, so frozen instances cannot be modified.
+        frozen = True
+
 
 class TestCodeResponse(BaseModel):
     """Represents the response from test code generation."""
 
     tests: list[TestCode]
+
+    class Config:
+        frozen = True
@@ -0,0 +1,392 @@
+"""Snippet execution for the Autonoma CodeExecutor.
+
+This module runs inside the executor's worker processes and only depends on the standard library.
+Run as a script, it serves executions over stdin/stdout: each request and response is a JSON
+object preceded by its length as a 4-byte big-endian integer. Where available, every execution
+runs in a child forked from the worker, so executions cannot affect each other.
+"""
+
+import contextlib
+import hashlib
+import importlib.machinery
+import io
+import json
+import linecache
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+import types
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Sequence, Tuple
+
+TIMEOUT_OUTPUT = "Execution timed out"
+
+_CODE_CACHE_SIZE = 256
+_code_cache: "OrderedDict[bytes, types.CodeType]" = OrderedDict()
+
+
+class _Timeout(BaseException):
+    """Raised inside the executed code when it runs past its timeout."""
+
+
+def _raise_timeout(signum, frame):
+    raise _Timeout()
+
+
+class _NullModule(types.ModuleType):
+    """
+    A module answering any attribute with another null module, which can also be called.
+
+    Resolved attributes are stored on the module, so repeated accesses are plain lookups.
+    """
+
+    def __getattr__(self, name: str) -> "_NullModule":
+        # Dunder lookups are probes by the import system, copy, pickle and the like.
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        value = _NullModule(f"{self.__name__}.{name}")
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs) -> "_NullModule":
+        return _NullModule(f"{self.__name__}()")
+
+
+def create_mock_module(module_name: str) -> types.ModuleType:
+    """
+    Create a mock module.
+
+    Args:
+        module_name: The name of the module to mock.
+
+    Returns:
+        A module whose attributes, at any depth, are callable no-ops.
+    """
+    mock_module = _NullModule(module_name)
+    mock_module.__file__ = f"/mock/{module_name}.py"
+    mock_module.__path__ = [f"/mock/{module_name}"]
+    return mock_module
+
+
+class _MockFinder:
+    """Import hook providing mocks for the submodules of mocked modules, e.g. `numpy.linalg`."""
+
+    def __init__(self, module_names: Sequence[str]):
+        self.module_names = frozenset(module_names)
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        if fullname.partition(".")[0] not in self.module_names:
+            return None
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec) -> types.ModuleType:
+        return create_mock_module(spec.name)
+
+    def exec_module(self, module: types.ModuleType) -> None:
+        pass
+
+
+def _install_mocks(module_names: Sequence[str]) -> Dict[str, Optional[types.ModuleType]]:
+    """
+    Replace modules in `sys.modules` with fresh mocks, and mock their submodules on import.
+
+    Args:
+        module_names: The names of the top-level modules to mock.
+
+    Returns:
+        The replaced entries of `sys.modules`, None for modules that were not imported.
+    """
+    replaced = {}
+    for name in module_names:
+        replaced[name] = sys.modules.get(name)
+        sys.modules[name] = create_mock_module(name)
+    if module_names:
+        sys.meta_path.insert(0, _MockFinder(module_names))
+    return replaced
+
+
+def _uninstall_mocks(replaced: Dict[str, Optional[types.ModuleType]]) -> None:
+    """
+    Restore the entries of `sys.modules` replaced by `_install_mocks`.
+
+    Args:
+        replaced: The replaced entries.
+    """
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, _MockFinder)]
+    for name in list(sys.modules):
+        if name.partition(".")[0] in replaced and isinstance(sys.modules[name], _NullModule):
+            del sys.modules[name]
+    for name, module in replaced.items():
+        if module is not None:
+            sys.modules[name] = module
+
+
+def _main_file(temp_dir: Optional[str]) -> str:
+    return os.path.join(temp_dir, "__main__.py") if temp_dir else "<string>"
+
+
+def _compile(code: str, filename: str) -> types.CodeType:
+    """
+    Compile code, reusing the code object of an earlier compilation of the same code.
+
+    Args:
+        code: The code to compile.
+        filename: The file name reported in tracebacks.
+
+    Returns:
+        The compiled code object.
+    """
+    key = hashlib.blake2b(f"{filename}\0{code}".encode("utf-8"), digest_size=16).digest()
+    code_object = _code_cache.get(key)
+    if code_object is None:
+        code_object = _code_cache[key] = compile(code, filename, "exec")
+        if len(_code_cache) > _CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+    else:
+        _code_cache.move_to_end(key)
+    return code_object
+
+
+def execute(
+    temp_dir: Optional[str],
+    code: str,
+    timeout: float,
+    mocked_modules: Sequence[str] = (),
+    work_dir: Optional[str] = None,
+) -> Tuple[bool, str]:
+    """
+    Execute code as `__main__` with the materialized codebase importable.
+
+    The code runs in an empty working directory of its own, so files it creates do not outlive
+    the execution and cannot shadow codebase modules in later executions. The interpreter is
+    reused across executions, so the working directory, `sys.path`, `sys.argv`, `__main__`, the
+    mocked modules and the codebase modules imported by the code are restored afterwards.
+
+    Args:
+        temp_dir: The directory holding the codebase, put on `sys.path`, or None when the code
+            does not use the codebase.
+        code: The code to execute.
+        timeout: The number of seconds after which the execution is interrupted.
+        mocked_modules: The names of the modules to replace with mocks during the execution.
+        work_dir: The empty directory to run the code in, which the caller removes afterwards, or
+            None to use a temporary directory removed at the end of the execution.
+
+    Returns:
+        A tuple of whether the code exited successfully and its stdout on success, or its
+        stderr on failure.
+    """
+    if work_dir is None:
+        work_dir = tempfile.mkdtemp(prefix="autonoma-run-")
+        try:
+            return execute(temp_dir, code, timeout, mocked_modules, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    main_file = _main_file(temp_dir)
+    # A fresh module stands in for __main__ so that e.g. unittest.main() finds the tests.
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = main_file
+    # The code is not written to disk, so register its source for the lines in tracebacks.
+    linecache.cache[main_file] = (len(code), None, code.splitlines(True), main_file)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_path, saved_argv, saved_cwd = list(sys.path), sys.argv, os.getcwd()
+    saved_main = sys.modules["__main__"]
+    use_alarm = hasattr(signal, "setitimer")
+    success = True
+
+    if temp_dir:
+        sys.path.insert(0, temp_dir)
+    sys.argv = [main_file]
+    sys.modules["__main__"] = main_module
+    replaced_modules = _install_mocks(mocked_modules)
+    os.chdir(work_dir)
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                exec(_compile(code, main_file), main_module.__dict__)
+            except SystemExit as exit_:
+                success = exit_.code is None or exit_.code == 0
+                if not success and not isinstance(exit_.code, int):
+                    print(exit_.code, file=sys.stderr)
+            except _Timeout:
+                return False, TIMEOUT_OUTPUT
+            except BaseException:
+                traceback.print_exc()
+                success = False
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        sys.path[:] = saved_path
+        sys.argv = saved_argv
+        sys.modules["__main__"] = saved_main
+        _uninstall_mocks(replaced_modules)
+        os.chdir(saved_cwd)
+        if temp_dir:
+            _unload_modules(temp_dir)
+
+    return success, stdout.getvalue() if success else stderr.getvalue()
+
+
+def _execute_forked(
+    temp_dir: Optional[str], code: str, timeout: float, mocked_modules: Sequence[str] = ()
+) -> Tuple[bool, str]:
+    """
+    Execute code with `execute` in a child process forked from the current one.
+
+    The child starts from the already initialized interpreter, so nothing the code does, from
+    imports to changed globals, outlives the execution. The code is compiled before forking so
+    the compiled code stays cached in this process.
+
+    Args:
+        temp_dir: The directory holding the codebase, or None when the code does not use it.
+        code: The code to execute.
+        timeout: The number of seconds after which the execution is interrupted.
+        mocked_modules: The names of the modules to replace with mocks during the execution.
+
+    Returns:
+        A tuple of whether the code exited successfully and its output.
+    """
+    try:
+        _compile(code, _main_file(temp_dir))
+    except (SyntaxError, ValueError):
+        pass  # Reported by the child like any other error.
+
+    # The working directory is removed here, as the child may be killed before it cleans up.
+    work_dir = tempfile.mkdtemp(prefix="autonoma-run-")
+    try:
+        return _wait_forked(temp_dir, code, timeout, mocked_modules, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _wait_forked(
+    temp_dir: Optional[str], code: str, timeout: float, mocked_modules: Sequence[str], work_dir: str
+) -> Tuple[bool, str]:
+    """Fork a child running `execute` in `work_dir` and wait for its result."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            # The protocol pipe must not be readable by the executed code.
+            null_fd = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(null_fd, 0)
+            os.close(null_fd)
+            result = execute(temp_dir, code, timeout, mocked_modules, work_dir)
+            with os.fdopen(write_fd, "wb") as pipe:
+                pipe.write(json.dumps(result).encode("utf-8"))
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(write_fd)
+    chunks = []
+    # The child interrupts the code itself; the margin only covers code ignoring the interrupt.
+    deadline = time.monotonic() + timeout + 0.5
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return False, TIMEOUT_OUTPUT
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(read_fd)
+
+    _, status = os.waitpid(pid, 0)
+    if not chunks:
+        # The code ended the process itself, e.g. through os._exit() or a signal.
+        exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        return False, f"Execution exited with code {exit_code}"
+    success, output = json.loads(b"".join(chunks).decode("utf-8"))
+    return success, output
+
+
+def _unload_modules(directory: str) -> None:
+    """
+    Remove the modules imported from a directory from `sys.modules`.
+
+    Args:
+        directory: The directory whose modules are removed.
+    """
+    prefix = os.path.join(directory, "")
+    for name, module in list(sys.modules.items()):
+        if (getattr(module, "__file__", None) or "").startswith(prefix):
+            del sys.modules[name]
+
+
+def _read_message(stream: BinaryIO) -> Optional[dict]:
+    """
+    Read a length-prefixed JSON message.
+
+    Args:
+        stream: The stream to read from.
+
+    Returns:
+        The decoded message, or None once the stream is closed.
+    """
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (length,) = struct.unpack(">I", header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def _write_message(stream: BinaryIO, message: dict) -> None:
+    """
+    Write a length-prefixed JSON message.
+
+    Args:
+        stream: The stream to write to.
+        message: The message to write.
+    """
+    payload = json.dumps(message).encode("utf-8")
+    stream.write(struct.pack(">I", len(payload)) + payload)
+    stream.flush()
+
+
+def main() -> None:
+    """Serve execution requests from stdin until it is closed by the executor."""
+    requests = sys.stdin.buffer
+    # Keep a private handle on the protocol pipe and point fd 1 at stderr, so that output
+    # written directly to the file descriptor by the executed code cannot corrupt a response.
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    # Started from its file, the runner's own directory is first on sys.path, where it would
+    # shadow the modules of the executed code.
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+    # Tell the executor that startup succeeded.
+    _write_message(responses, {"ready": True})
+
+    run = _execute_forked if hasattr(os, "fork") else execute
+    while True:
+        request = _read_message(requests)
+        if request is None:
+            break
+        ok, output = run(
+            request["temp_dir"], request["code"], request["timeout"], request["mocked_modules"]
+        )
+        _write_message(responses, {"ok": ok, "output": output})
+
+
+if __name__ == "__main__":
+    main()
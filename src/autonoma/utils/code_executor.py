@@ -1,25 +1,264 @@
 """CodeExecutor module for the Autonoma package."""
 
+import contextlib
 import tempfile
 import os
+import shutil
+import sysconfig
 import sys
+import threading
 import subprocess
-import ast
-from unittest.mock import MagicMock
+import weakref
+import hashlib
+import re
 from types import ModuleType
 import pkgutil
-from typing import List, Dict, Set
+from collections import OrderedDict
+from typing import Iterator, List, Dict, Optional, Set, Tuple
 from autonoma.models import ExecutionResult
+from autonoma.utils import _runner
+
+# Matches `from module import ...` and `import module [as name], ...` statements at the start of
+# a line or after `;` or `:` (as in `import os; import numpy` or `try: import yaml`). Unlike a
+# parse, it also matches imports quoted in strings, which only means an extra mock.
+_IMPORT_RE = re.compile(
+    r"(?:^|[;:])[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import\b"
+    r"|import[ \t]+([\w.]+(?:[ \t]+as[ \t]+\w+)?"
+    r"(?:[ \t]*,[ \t]*[\w.]+(?:[ \t]+as[ \t]+\w+)?)*))",
+    re.MULTILINE,
+)
+
+
+def _stdlib_module_names() -> Set[str]:
+    """
+    Return the names of the standard library modules.
+
+    Returns:
+        The top-level module names of the standard library, including builtin modules.
+    """
+    names = getattr(sys, "stdlib_module_names", None)
+    if names is None:
+        # Before Python 3.10, list the standard library directories rather than all of sys.path,
+        # which would also count installed third-party packages as standard library.
+        stdlib = sysconfig.get_paths()["stdlib"]
+        paths = [stdlib, os.path.join(stdlib, "lib-dynload")]
+        names = {module.name for module in pkgutil.iter_modules(paths)}
+    return set(names) | set(sys.builtin_module_names)
+
+
+def _top_level_modules(codebase: Dict[str, str]) -> Set[str]:
+    """
+    Return the names of the top-level modules and packages of a codebase.
+
+    Args:
+        codebase: The codebase, mapping file paths to their content.
+
+    Returns:
+        The names importable from the root of the codebase.
+    """
+    modules = set()
+    for path in codebase:
+        name = path.replace(os.sep, "/").partition("/")[0]
+        modules.add(name[:-3] if name.endswith(".py") else name)
+    return modules
+
+
+def _materialize(directory: str, codebase: Dict[str, str]) -> None:
+    """
+    Write a codebase into a directory, creating each subdirectory once.
+
+    Args:
+        directory: The directory to write the codebase into.
+        codebase: The codebase, mapping file paths to their content.
+    """
+    files = {os.path.join(directory, path): content for path, content in codebase.items()}
+    for subdirectory in sorted({os.path.dirname(path) for path in files}, key=len):
+        os.makedirs(subdirectory, exist_ok=True)
+    for path, content in files.items():
+        _write_file(path, content)
+
+
+def _write_file(path: str, content: str) -> None:
+    """
+    Write a file with a single write call, bypassing Python file objects.
+
+    Args:
+        path: The path of the file to write.
+        content: The content of the file.
+    """
+    data = content.encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+
+
+class _WorkerDied(Exception):
+    """Raised when a worker process exits before answering a request."""
+
+
+class _PersistentWorker:
+    """A long-lived Python process executing code sent by the CodeExecutor over its stdin/stdout."""
+
+    def __init__(self):
+        """
+        Start the worker process and wait until it is ready.
+
+        The runner only depends on the standard library and is started from its file, so the
+        worker does not need to be able to import autonoma.
+
+        Raises:
+            _WorkerDied: If the worker fails to start, with the end of its stderr.
+        """
+        # A file rather than a pipe, so that a worker writing a lot to stderr cannot block.
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            [sys.executable, "-u", _runner.__file__],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+        self._killed = False
+        if _runner._read_message(self._process.stdout) is None:
+            self._process.wait()
+            raise _WorkerDied(
+                f"Worker failed to start (exit code {self._process.returncode}):\n"
+                + self._stderr_tail()
+            )
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def exec(
+        self, temp_dir: Optional[str], code: str, timeout: float, mocked_modules: List[str]
+    ) -> Tuple[bool, str]:
+        """
+        Execute code in the worker.
+
+        The worker interrupts the code itself once the timeout is reached; the process is only
+        killed when it does not answer shortly after, e.g. because the code ignores the interrupt.
+
+        Args:
+            temp_dir: The directory holding the codebase, or None if the code does not use it.
+            code: The code to execute.
+            timeout: The number of seconds after which the execution is aborted.
+            mocked_modules: The names of the modules to replace with mocks.
+
+        Returns:
+            A tuple of whether the code exited successfully and its output.
+
+        Raises:
+            _WorkerDied: If the worker exited or was killed before answering.
+        """
+        killer = threading.Timer(timeout + 2, self.kill)
+        killer.daemon = True
+        killer.start()
+        try:
+            request = {
+                "temp_dir": temp_dir,
+                "code": code,
+                "timeout": timeout,
+                "mocked_modules": mocked_modules,
+            }
+            _runner._write_message(self._process.stdin, request)
+            response = _runner._read_message(self._process.stdout)
+        except (BrokenPipeError, ValueError) as e:
+            raise _WorkerDied(str(e)) from e
+        finally:
+            killer.cancel()
+
+        if response is None:
+            self._process.wait()
+            if self._killed:
+                raise _WorkerDied(_runner.TIMEOUT_OUTPUT)
+            raise _WorkerDied(
+                f"Worker exited with code {self._process.returncode}:\n" + self._stderr_tail()
+            )
+        return response["ok"], response["output"]
+
+    def _stderr_tail(self, size: int = 4096) -> str:
+        """
+        Return the end of the worker's stderr.
+
+        Args:
+            size: The maximum number of bytes to return.
+
+        Returns:
+            The decoded end of the worker's stderr.
+        """
+        self._stderr.seek(0, os.SEEK_END)
+        self._stderr.seek(max(0, self._stderr.tell() - size))
+        return self._stderr.read().decode("utf-8", errors="replace")
+
+    def kill(self) -> None:
+        """Kill the worker process."""
+        self._killed = True
+        self._process.kill()
+
+    def close(self) -> None:
+        """Stop the worker process by closing its stdin."""
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._stderr.close()
+
+
+def _cleanup(idle_workers: List[_PersistentWorker], scratch_dirs: Dict[bytes, str]) -> None:
+    """
+    Stop the idle workers and remove the scratch directories of a CodeExecutor.
+
+    Args:
+        idle_workers: The idle workers, emptied in place.
+        scratch_dirs: The scratch directories by codebase digest, emptied in place.
+    """
+    for worker in idle_workers:
+        worker.close()
+    idle_workers.clear()
+    for directory in scratch_dirs.values():
+        shutil.rmtree(directory, ignore_errors=True)
+    scratch_dirs.clear()
 
 
 class CodeExecutor:
     """Executes code with mocking capabilities for external modules."""
 
-    def __init__(self):
-        """Initialize the CodeExecutor with stdlib modules."""
-        self.mocked_modules: Dict[str, MagicMock] = {}
-        self.stdlib_modules: Set[str] = set(m.name for m in pkgutil.iter_modules())
-        self.stdlib_modules.update(sys.builtin_module_names)
+    def __init__(
+        self, timeout: float = 10, max_workers: Optional[int] = None, max_scratch_dirs: int = 8
+    ):
+        """
+        Initialize the CodeExecutor with stdlib modules.
+
+        Args:
+            timeout: The number of seconds after which an execution is aborted.
+            max_workers: The maximum number of worker processes, defaulting to the number of CPUs.
+            max_scratch_dirs: The number of codebase directories kept for reuse across runs.
+        """
+        self.timeout = timeout
+        self.max_workers = max_workers or os.cpu_count()
+        self.mocked_modules: List[str] = []
+        self.stdlib_modules: Set[str] = _stdlib_module_names()
+        # Guards the mock bookkeeping and the workers when tests are run from several threads.
+        self._lock = threading.Lock()
+        self._import_cache: Dict[bytes, List[str]] = {}
+        self._idle_workers: List[_PersistentWorker] = []
+        self._startup_error: Optional[str] = None
+        self._worker_slots = threading.BoundedSemaphore(self.max_workers)
+        self.max_scratch_dirs = max_scratch_dirs
+        self._scratch_dirs: "OrderedDict[bytes, str]" = OrderedDict()
+        self._scratch_users: Dict[str, int] = {}
+        self._scratch_lock = threading.Lock()
+        # Clean up when the executor is garbage collected or at exit, whichever comes first,
+        # without keeping the executor alive until exit.
+        weakref.finalize(self, _cleanup, self._idle_workers, self._scratch_dirs)
 
     def analyze_imports(self, code: str) -> List[str]:
         """
@@ -31,75 +270,85 @@ class CodeExecutor:
         Returns:
             A list of imported module names.
         """
-        tree = ast.parse(code)
-        imports = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                imports.extend(alias.name.split(".")[0] for alias in node.names)
-            elif isinstance(node, ast.ImportFrom):
-                if node.module:
-                    imports.append(node.module.split(".")[0])
-        return imports
+        # Tests are executed repeatedly against the same code, so scan each snippet only once.
+        key = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+        imports = self._import_cache.get(key)
+        if imports is None:
+            imports = []
+            for from_module, modules in _IMPORT_RE.findall(code):
+                if from_module:
+                    # Relative imports (`from . import x`) have no top-level module name.
+                    if from_module.partition(".")[0]:
+                        imports.append(from_module.partition(".")[0])
+                else:
+                    imports.extend(
+                        module.strip().partition(" ")[0].partition(".")[0]
+                        for module in modules.split(",")
+                    )
+            self._import_cache[key] = imports
+        return list(imports)
 
-    def is_external_module(self, module_name: str, codebase: Dict[str, str]) -> bool:
+    def is_external_module(self, module_name: str, codebase_modules: Set[str]) -> bool:
         """
         Check if a module is external (not in stdlib or codebase).
 
         Args:
             module_name: The name of the module to check.
-            codebase: The current codebase.
+            codebase_modules: The top-level module names of the current codebase.
 
         Returns:
             True if the module is external, False otherwise.
         """
-        if module_name in self.stdlib_modules:
-            return False
-        if any(module_name in file_path for file_path in codebase.keys()):
-            return False
-        return True
+        return module_name not in self.stdlib_modules and module_name not in codebase_modules
 
-    def create_mock_module(self, module_name: str) -> MagicMock:
+    def create_mock_module(self, module_name: str) -> ModuleType:
         """
         Create a mock module.
 
+        The mocks used by the executed code are created by the worker processes; this builds the
+        same mock for use in the current process.
+
         Args:
             module_name: The name of the module to mock.
 
         Returns:
-            A MagicMock object representing the mocked module.
+            A module whose attributes, at any depth, are callable no-ops.
         """
-        mock_module = MagicMock(spec=ModuleType(module_name))
-        mock_module.__name__ = module_name
-        mock_module.__file__ = f"/mock/{module_name}.py"
-        mock_module.__path__ = [f"/mock/{module_name}"]
-        mock_module.__loader__ = MagicMock()
-        mock_module.__spec__ = MagicMock()
-        return mock_module
+        return _runner.create_mock_module(module_name)
 
-    def mock_external_modules(self, code: str, codebase: Dict[str, str]) -> None:
+    def mock_external_modules(self, code: str, codebase: Dict[str, str]) -> List[str]:
         """
-        Mock external modules found in the code.
+        Find the external modules imported by the code, which are mocked when it runs.
+
+        When the code imports from the codebase, the imports of the codebase's Python files are
+        included as well, since they run as part of the code. The modules are also added to
+        `mocked_modules`, which reports every module mocked so far.
 
         Args:
             code: The code to analyze for external modules.
             codebase: The current codebase.
+
+        Returns:
+            The external modules imported by the code, in order of first import.
         """
+        codebase_modules = _top_level_modules(codebase)
         imports = self.analyze_imports(code)
-        for module_name in imports:
-            if self.is_external_module(module_name, codebase):
+        if any(module in codebase_modules for module in imports):
+            for path, content in sorted(codebase.items()):
+                if path.endswith(".py"):
+                    imports = imports + self.analyze_imports(content)
+        external_modules = list(
+            dict.fromkeys(
+                module_name
+                for module_name in imports
+                if self.is_external_module(module_name, codebase_modules)
+            )
+        )
+        with self._lock:
+            for module_name in external_modules:
                 if module_name not in self.mocked_modules:
-                    self.mocked_modules[module_name] = self.create_mock_module(module_name)
-
-    def patch_modules(self) -> None:
-        """Patch sys.modules with mocked modules."""
-        for module_name, mock_module in self.mocked_modules.items():
-            sys.modules[module_name] = mock_module
-
-    def unpatch_modules(self) -> None:
-        """Remove mocked modules from sys.modules."""
-        for module_name in self.mocked_modules:
-            if module_name in sys.modules:
-                del sys.modules[module_name]
+                    self.mocked_modules.append(module_name)
+        return external_modules
 
     def run(self, code: str, codebase: Dict[str, str]) -> ExecutionResult:
         """
@@ -112,51 +361,134 @@ class CodeExecutor:
         Returns:
             An ExecutionResult object containing the execution results.
         """
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create the project structure
-            for file_path, file_content in codebase.items():
-                full_path = os.path.join(temp_dir, file_path)
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, "w") as f:
-                    f.write(file_content)
-
-            # Create a __main__.py file with the code to execute
-            main_file = os.path.join(temp_dir, "__main__.py")
-            with open(main_file, "w") as f:
-                f.write(code)
+        # Self-contained code does not need the codebase on disk. When it does import from the
+        # codebase, all of it is needed since the imported modules may import the others.
+        imports = self.analyze_imports(code)
+        codebase_modules = _top_level_modules(codebase)
+        uses_codebase = any(module in codebase_modules for module in imports)
+        scratch_dir = self._scratch_dir(codebase) if uses_codebase else contextlib.nullcontext()
 
-            # Mock external modules
-            self.mock_external_modules(code, codebase)
-            self.patch_modules()
+        with scratch_dir as temp_dir:
+            # The mocks are installed by the worker, since the code does not run in this process.
+            # Only this run's imports are mocked: a module mocked for an earlier run may be part
+            # of this codebase.
+            mocked_modules = self.mock_external_modules(code, codebase)
 
             try:
-                # Prepare the Python command
-                python_command = [
-                    sys.executable,
-                    "-c",
-                    f"import sys; sys.path.insert(0, '{temp_dir}'); import __main__",
-                ]
-
-                # Run the code
-                result = subprocess.run(
-                    python_command, capture_output=True, text=True, timeout=10, cwd=temp_dir
-                )
+                worker = self._acquire_worker()
+            except _WorkerDied as e:
+                return ExecutionResult(success=False, output=str(e), mocked_modules=mocked_modules)
+            try:
+                success, output = worker.exec(temp_dir, code, self.timeout, mocked_modules)
 
                 return ExecutionResult(
-                    success=result.returncode == 0,
-                    output=result.stdout if result.returncode == 0 else result.stderr,
-                    mocked_modules=list(self.mocked_modules.keys()),
-                )
-            except subprocess.TimeoutExpired:
-                return ExecutionResult(
-                    success=False,
-                    output="Execution timed out",
-                    mocked_modules=list(self.mocked_modules.keys()),
+                    success=success, output=output, mocked_modules=mocked_modules
                 )
             except Exception as e:
-                return ExecutionResult(
-                    success=False, output=str(e), mocked_modules=list(self.mocked_modules.keys())
-                )
+                return ExecutionResult(success=False, output=str(e), mocked_modules=mocked_modules)
             finally:
-                # Clean up
-                self.unpatch_modules()
+                self._release_worker(worker)
+
+    def shutdown(self) -> None:
+        """Stop the idle worker processes; workers are started again by the next run."""
+        with self._lock:
+            workers = list(self._idle_workers)
+            self._idle_workers.clear()
+        for worker in workers:
+            worker.close()
+
+    @contextlib.contextmanager
+    def _scratch_dir(self, codebase: Dict[str, str]) -> Iterator[str]:
+        """
+        Provide a directory holding the codebase.
+
+        Directories are kept per codebase content, so running code repeatedly against the same
+        codebase only writes it once. The least recently used directories are removed once more
+        than `max_scratch_dirs` exist, and all of them at exit.
+
+        Args:
+            codebase: The codebase to materialize.
+
+        Yields:
+            The path of the directory, which is not removed while it is in use.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for path, content in sorted(codebase.items()):
+            digest.update(path.encode("utf-8") + b"\0" + content.encode("utf-8") + b"\0")
+        key = digest.digest()
+
+        with self._scratch_lock:
+            directory = self._scratch_dirs.get(key)
+            if directory is None:
+                directory = tempfile.mkdtemp(prefix="autonoma-")
+                _materialize(directory, codebase)
+                self._scratch_dirs[key] = directory
+            else:
+                self._scratch_dirs.move_to_end(key)
+            self._scratch_users[directory] = self._scratch_users.get(directory, 0) + 1
+            self._evict_scratch_dirs()
+        try:
+            yield directory
+        finally:
+            with self._scratch_lock:
+                self._scratch_users[directory] -= 1
+                if not self._scratch_users[directory]:
+                    del self._scratch_users[directory]
+                self._evict_scratch_dirs()
+
+    def _evict_scratch_dirs(self) -> None:
+        """Remove the least recently used scratch directories not in use beyond the limit."""
+        excess = len(self._scratch_dirs) - self.max_scratch_dirs
+        for key, directory in list(self._scratch_dirs.items()):
+            if excess <= 0:
+                break
+            if directory not in self._scratch_users:
+                del self._scratch_dirs[key]
+                shutil.rmtree(directory, ignore_errors=True)
+                excess -= 1
+
+    def _acquire_worker(self) -> _PersistentWorker:
+        """
+        Take an idle worker process, starting a new one when none is available.
+
+        Blocks while `max_workers` workers are busy. Once a worker failed to start, e.g. because
+        the interpreter is broken, the failure is raised again instead of starting more workers.
+
+        Returns:
+            The worker to execute the code.
+
+        Raises:
+            _WorkerDied: If no worker could be started.
+        """
+        if self._startup_error is not None:
+            raise _WorkerDied(self._startup_error)
+        self._worker_slots.acquire()
+        try:
+            with self._lock:
+                while self._idle_workers:
+                    worker = self._idle_workers.pop()
+                    if worker.alive:
+                        return worker
+                    worker.close()
+            return _PersistentWorker()
+        except _WorkerDied as e:
+            self._startup_error = str(e)
+            self._worker_slots.release()
+            raise
+        except BaseException:
+            self._worker_slots.release()
+            raise
+
+    def _release_worker(self, worker: _PersistentWorker) -> None:
+        """
+        Return a worker for reuse; workers that were killed are dropped and replaced on demand.
+
+        Args:
+            worker: The worker to release.
+        """
+        if worker.alive:
+            with self._lock:
+                self._idle_workers.append(worker)
+        else:
+            worker.close()
+        self._worker_slots.release()
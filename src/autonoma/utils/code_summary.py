@@ -0,0 +1,81 @@
+"""Code summary utilities for the Autonoma package."""
+
+import ast
+from typing import List
+
+
+def summarize_code(source: str) -> str:
+    """
+    Summarize Python source to its imports and top-level signatures.
+
+    Functions and methods are reduced to their signature and docstring, classes keep their
+    attributes and their methods' signatures, and other top-level statements are kept as they
+    are. Source that cannot
+    be parsed is returned unchanged.
+
+    Args:
+        source: The Python source to summarize.
+
+    Returns:
+        The summarized source.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+
+    lines = source.splitlines()
+    summary: List[str] = []
+    for node in tree.body:
+        summary.extend(_summarize_node(node, lines))
+    return "\n".join(summary) + "\n"
+
+
+def _summarize_node(node: ast.stmt, lines: List[str]) -> List[str]:
+    """
+    Summarize a single statement.
+
+    Args:
+        node: The statement to summarize.
+        lines: The lines of the source the statement was parsed from.
+
+    Returns:
+        The lines summarizing the statement.
+    """
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return lines[node.lineno - 1 : node.end_lineno]
+
+    start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+    first = node.body[0]
+    # Column offsets count UTF-8 bytes.
+    before_body = lines[first.lineno - 1].encode("utf-8")[: first.col_offset].decode("utf-8")
+    if before_body.strip():
+        # Drop the body following the signature on its last line, e.g. `def f(): return 1`.
+        summary = lines[start - 1 : first.lineno - 1] + [before_body.rstrip()]
+    else:
+        summary = lines[start - 1 : first.lineno - 1]
+    indent = " " * (node.col_offset + 4)
+
+    docstring = ast.get_docstring(node)
+    if docstring:
+        docstring = "\n".join(
+            f"{indent}{line}" if line else line for line in docstring.splitlines()
+        ).lstrip()
+        summary.append(f'{indent}"""{docstring}"""')
+
+    if isinstance(node, ast.ClassDef):
+        members = [
+            member
+            for member in node.body
+            if isinstance(
+                member,
+                (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Assign, ast.AnnAssign),
+            )
+        ]
+        for member in members:
+            summary.extend(_summarize_node(member, lines))
+        if not members:
+            summary.append(f"{indent}...")
+    else:
+        summary.append(f"{indent}...")
+    return summary
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 
 
 class FileManager:
@@ -7,12 +8,13 @@ class FileManager:
         os.makedirs(self.base_dir, exist_ok=True)
 
     def write_file(self, file_path, content):
-        full_path = os.path.join(self.base_dir, file_path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        with open(full_path, "w") as f:
-            f.write(content)
+        full_path = Path(self.base_dir) / file_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write a sibling file first and rename it over the target, so that an interrupted write
+        # never leaves a truncated file behind.
+        temp_path = full_path.with_name(full_path.name + ".tmp")
+        temp_path.write_bytes(content.encode("utf-8"))
+        os.replace(temp_path, full_path)
 
     def read_file(self, file_path):
-        full_path = os.path.join(self.base_dir, file_path)
-        with open(full_path, "r") as f:
-            return f.read()
+        return (Path(self.base_dir) / file_path).read_bytes().decode("utf-8")
@@ -1,70 +1,105 @@
 """File operation utilities for the Autonoma package."""
 
-import os
-import json
-from typing import Dict, List
+import sys
+import traceback
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+import orjson
 from autonoma.models import FinalResult, AgentResult
 
+ARCHIVE_NAME = "autonoma_run.zip"
 
-def store_results(final_result: FinalResult) -> None:
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autonoma-store")
+
+
+def store_results(final_result: FinalResult, as_archive: bool = True) -> None:
     """
-    Store the final results to separate files.
+    Store the final results in the output directory.
 
     Args:
         final_result: The FinalResult object containing the results to store.
+        as_archive: Whether to store the modified and new files in a single zip archive
+            instead of one file per path.
     """
-    os.makedirs(final_result.output_directory, exist_ok=True)
+    project_result = final_result.project_result
+    output_directory = Path(final_result.output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
 
     # Store project details
-    with open(f"{final_result.output_directory}/project.json", "w") as f:
-        json.dump(final_result.project_result.project.dict(), f, indent=2)
-
-    # Store modified files
-    for file_path, content in final_result.project_result.modified_files.items():
-        with open(f"{final_result.output_directory}/{file_path}", "w") as f:
-            f.write(content)
-
-    # Store new files
-    for file_path, content in final_result.project_result.new_files.items():
-        with open(f"{final_result.output_directory}/{file_path}", "w") as f:
-            f.write(content)
+    (output_directory / "project.json").write_bytes(
+        orjson.dumps(project_result.project.dict(), option=orjson.OPT_INDENT_2)
+    )
+
+    # Store modified and new files
+    files = {**project_result.modified_files, **project_result.new_files}
+    if as_archive:
+        with zipfile.ZipFile(output_directory / ARCHIVE_NAME, "w", zipfile.ZIP_DEFLATED) as archive:
+            for file_path, content in files.items():
+                archive.writestr(file_path, content)
+    elif files:
+        paths = {output_directory / file_path: content for file_path, content in files.items()}
+        for directory in {path.parent for path in paths}:
+            directory.mkdir(parents=True, exist_ok=True)
+        # File writes release the GIL, so writing many files from threads overlaps their I/O.
+        with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+            for _ in executor.map(_write_file, paths.keys(), paths.values()):
+                pass
 
     # Store thought process
-    with open(f"{final_result.output_directory}/thought_process.txt", "w") as f:
-        f.write("\n".join(final_result.project_result.thought_process))
+    (output_directory / "thought_process.txt").write_text("\n".join(project_result.thought_process))
 
     print(f"Results stored in the '{final_result.output_directory}' directory")
 
 
-def get_modified_files(agent_results: List[AgentResult]) -> Dict[str, str]:
+def _write_file(path: Path, content: str) -> None:
+    path.write_bytes(content.encode("utf-8"))
+
+
+def store_results_in_background(
+    final_result: FinalResult, as_archive: bool = True
+) -> "Future[None]":
     """
-    Get all modified files from the agent results.
+    Store the final results without waiting for the files to be written.
+
+    Writes are queued on a single background thread, so results stored one after another do not
+    interleave, and pending writes still complete before the interpreter exits. A failure is
+    reported on stderr even if nobody waits for the returned future.
 
     Args:
-        agent_results: A list of AgentResult objects.
+        final_result: The FinalResult object containing the results to store.
+        as_archive: Whether to store the modified and new files in a single zip archive.
 
     Returns:
-        A dictionary of modified file paths and their contents.
+        A future resolving once the results are stored.
     """
-    modified_files = {}
-    for agent_result in agent_results:
-        for task_result in agent_result.task_results:
-            modified_files.update(task_result.modified_files)
-    return modified_files
+    future = _store_executor.submit(store_results, final_result, as_archive)
+    future.add_done_callback(_report_store_failure)
+    return future
 
 
-def get_new_files(agent_results: List[AgentResult]) -> Dict[str, str]:
+def _report_store_failure(future: "Future[None]") -> None:
+    error = None if future.cancelled() else future.exception()
+    if error is not None:
+        print(f"Failed to store results: {error!r}", file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+
+
+def split_files(agent_results: List[AgentResult]) -> Tuple[Dict[str, str], Dict[str, str]]:
     """
-    Get all new files from the agent results.
+    Get all modified and new files from the agent results in a single pass.
 
     Args:
         agent_results: A list of AgentResult objects.
 
     Returns:
-        A dictionary of new file paths and their contents.
+        A tuple of the dictionaries of modified and of new file paths and their contents.
     """
-    new_files = {}
+    modified_files: Dict[str, str] = {}
+    new_files: Dict[str, str] = {}
     for agent_result in agent_results:
         for task_result in agent_result.task_results:
+            modified_files.update(task_result.modified_files)
             new_files.update(task_result.new_files)
-    return new_files
+    return modified_files, new_files
@@ -0,0 +1,491 @@
+"""LLM response caching utilities for the Autonoma package."""
+
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from autonoma.utils.llm_interface import accepts_response_format
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "autonoma", "llm", "responses.sqlite3"
+)
+
+Embedder = Callable[[str], Sequence[float]]
+
+
+class _CacheEntry(NamedTuple):
+    response: str
+    scope: str
+    embedding: Optional[List[float]]
+    expires_at: Optional[float]
+
+
+def load_sentence_embedder(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Embedder:
+    """
+    Load a local sentence-transformers model to embed prompts.
+
+    Args:
+        model_name: The name of the sentence-transformers model to load.
+
+    Returns:
+        A callable mapping a prompt to its embedding vector.
+
+    Raises:
+        ImportError: If sentence-transformers is not installed.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    return lambda text: model.encode(text).tolist()
+
+
+def _forwarded_kwargs(method: Callable[..., Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the response format from the arguments of a wrapped method not accepting it."""
+    if "response_format" in kwargs and not accepts_response_format(method):
+        return {key: value for key, value in kwargs.items() if key != "response_format"}
+    return kwargs
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        return [float(value) for value in vector]
+    return [value / norm for value in vector]
+
+
+class LLMCache:
+    """
+    Cache of LLM responses with exact and semantic lookup.
+
+    Responses are stored under a SHA256 key of (system prompt, user prompt, model). When an
+    embedder is configured, a miss on the exact key falls back to the most cosine-similar prompt
+    cached under the same system prompt and model, provided it scores above the threshold.
+
+    When a path is given, responses are also persisted to a SQLite database so that they are
+    reused by later processes; only exact lookups are served from it.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.92,
+        ttl: Optional[float] = 3600.0,
+        max_entries: int = 1024,
+        path: Optional[str] = None,
+    ):
+        """
+        Initialize the LLMCache.
+
+        Args:
+            embedder: Callable embedding a prompt; semantic lookup is disabled when None.
+            similarity_threshold: Minimum cosine similarity for a semantic hit.
+            ttl: Seconds an entry stays valid, or None to never expire.
+            max_entries: Maximum number of cached responses kept in memory before evicting the
+                oldest.
+            path: The SQLite database persisting the responses, or None to only keep them in
+                memory.
+        """
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Accesses are serialized by the lock, so the connection can be shared by threads.
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(user_prompt: str, system_prompt: str = "", model: str = "") -> str:
+        """
+        Build the exact-match key for a prompt.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            model: The name of the model answering the prompt.
+
+        Returns:
+            The hex SHA256 digest identifying the prompt.
+        """
+        digest = hashlib.sha256()
+        for part in (system_prompt, user_prompt, model):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(
+        self, user_prompt: str, system_prompt: str = "", model: str = ""
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Look up a cached response for a prompt.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            model: The name of the model answering the prompt.
+
+        Returns:
+            A tuple of the cached response (None on a miss) and the prompt embedding, which can
+            be handed back to `store` to avoid embedding the prompt twice.
+        """
+        key = self.make_key(user_prompt, system_prompt, model)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.response, entry.embedding
+            entry = self._load(key, system_prompt, model)
+            if entry is not None:
+                self._insert(key, entry)
+                self.stats["hits"] += 1
+                return entry.response, None
+
+        if self.embedder is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, None
+
+        embedding = _normalize(self.embedder(user_prompt))
+        scope = self.make_key("", system_prompt, model)
+
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for candidate_key, candidate in self._entries.items():
+                if candidate.scope != scope or candidate.embedding is None:
+                    continue
+                score = sum(a * b for a, b in zip(embedding, candidate.embedding))
+                if score >= best_score:
+                    best_key, best_score = candidate_key, score
+
+            if best_key is None:
+                self.stats["misses"] += 1
+                return None, embedding
+
+            self._entries.move_to_end(best_key)
+            self.stats["hits"] += 1
+            return self._entries[best_key].response, embedding
+
+    def store(
+        self,
+        user_prompt: str,
+        response: str,
+        system_prompt: str = "",
+        model: str = "",
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        """
+        Store a response for a prompt.
+
+        Args:
+            user_prompt: The user prompt.
+            response: The response returned by the language model.
+            system_prompt: The system prompt.
+            model: The name of the model answering the prompt.
+            embedding: The normalized prompt embedding returned by `lookup`, if any.
+        """
+        if embedding is None and self.embedder is not None:
+            embedding = _normalize(self.embedder(user_prompt))
+
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        entry = _CacheEntry(
+            response=response,
+            scope=self.make_key("", system_prompt, model),
+            embedding=embedding,
+            expires_at=expires_at,
+        )
+
+        with self._lock:
+            key = self.make_key(user_prompt, system_prompt, model)
+            self._insert(key, entry)
+            if self._db is not None:
+                now = time.time()
+                if self.ttl is not None:
+                    self._db.execute(
+                        "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,)
+                    )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, now)
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Remove all cached responses, including persisted ones, and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.stats = {"hits": 0, "misses": 0}
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def _load(self, key: str, system_prompt: str, model: str) -> Optional[_CacheEntry]:
+        """
+        Load a persisted response; must be called with the lock held.
+
+        Args:
+            key: The exact-match key of the prompt.
+            system_prompt: The system prompt.
+            model: The name of the model answering the prompt.
+
+        Returns:
+            The entry of the persisted response, or None if there is none or it has expired.
+        """
+        if self._db is None:
+            return None
+        query = "SELECT response, created_at FROM responses WHERE key = ?"
+        parameters: Tuple[Any, ...] = (key,)
+        if self.ttl is not None:
+            query += " AND created_at > ?"
+            parameters += (time.time() - self.ttl,)
+        row = self._db.execute(query, parameters).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        expires_at = None
+        if self.ttl is not None:
+            # Persisted times are wall-clock times, while entries expire on the monotonic clock.
+            expires_at = time.monotonic() + created_at + self.ttl - time.time()
+        return _CacheEntry(
+            response=response,
+            scope=self.make_key("", system_prompt, model),
+            embedding=None,
+            expires_at=expires_at,
+        )
+
+    def _insert(self, key: str, entry: _CacheEntry) -> None:
+        """Add an entry to the memory cache, evicting the oldest beyond `max_entries`."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry.expires_at is not None and entry.expires_at <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+
+
+class CachingLLMInterface:
+    """
+    Wraps an LLM interface so repeated or near-identical prompts are served from an LLMCache.
+
+    Prompts usually start with long static instructions followed by the per-call content. A user
+    prompt starting with one of the given prompt prefixes is cached with the prefix, the system
+    prompt and the response format as its scope, and only the remainder is embedded, so that
+    semantic lookup compares the per-call content instead of the shared instructions.
+    """
+
+    def __init__(
+        self,
+        llm_interface: Any,
+        cache: Optional[LLMCache] = None,
+        prompt_prefixes: Sequence[str] = (),
+    ):
+        """
+        Initialize the CachingLLMInterface.
+
+        Args:
+            llm_interface: The interface to the language model to wrap.
+            cache: The cache to serve responses from; a new exact-match cache is used when None.
+            prompt_prefixes: The static prefixes of the user prompts sent through the interface.
+        """
+        self.llm_interface = llm_interface
+        self.cache = cache if cache is not None else LLMCache()
+        # Longest first, so the most specific prefix wins.
+        self.prompt_prefixes = sorted(prompt_prefixes, key=len, reverse=True)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm_interface, "model", "")
+
+    @property
+    def _cache_model(self) -> str:
+        # Responses sampled at different temperatures are not interchangeable.
+        temperature = getattr(self.llm_interface, "temperature", None)
+        return self.model if temperature is None else f"{self.model}@{temperature}"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats
+
+    def _split_prompt(
+        self, user_prompt: str, system_prompt: str, kwargs: Dict[str, Any]
+    ) -> Tuple[str, str]:
+        """
+        Split a prompt into its per-call content and the context scoping it in the cache.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            kwargs: The extra arguments passed to the wrapped interface.
+
+        Returns:
+            A tuple of the per-call part of the user prompt and the context, which stands in for
+            the system prompt in the cache.
+        """
+        prefix = next((p for p in self.prompt_prefixes if user_prompt.startswith(p)), "")
+        context = [system_prompt, prefix]
+        response_format = kwargs.get("response_format")
+        if response_format is not None:
+            context.append(json.dumps(response_format, sort_keys=True))
+        return user_prompt[len(prefix) :], "\0".join(context)
+
+    def generate(self, user_prompt: str, system_prompt: str = "", **kwargs: Any) -> str:
+        """
+        Generate a response, returning a cached one when available.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            **kwargs: Extra arguments passed through to the wrapped interface.
+
+        Returns:
+            The response of the language model.
+        """
+        content, context = self._split_prompt(user_prompt, system_prompt, kwargs)
+        response, embedding = self.cache.lookup(content, context, self._cache_model)
+        if response is not None:
+            return response
+
+        if system_prompt:
+            kwargs["system_prompt"] = system_prompt
+        generate = self.llm_interface.generate
+        response = generate(user_prompt, **_forwarded_kwargs(generate, kwargs))
+        self.cache.store(content, response, context, self._cache_model, embedding)
+        return response
+
+    def generate_stream(
+        self, user_prompt: str, system_prompt: str = "", **kwargs: Any
+    ) -> Iterator[str]:
+        """
+        Stream a response, replaying a cached one as a single chunk when available.
+
+        The streamed response is only cached once it has been consumed completely.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            **kwargs: Extra arguments passed through to the wrapped interface.
+
+        Yields:
+            Chunks of the response of the language model.
+        """
+        content, context = self._split_prompt(user_prompt, system_prompt, kwargs)
+        response, embedding = self.cache.lookup(content, context, self._cache_model)
+        if response is not None:
+            yield response
+            return
+
+        if system_prompt:
+            kwargs["system_prompt"] = system_prompt
+        if hasattr(self.llm_interface, "generate_stream"):
+            chunks = []
+            generate_stream = self.llm_interface.generate_stream
+            kwargs = _forwarded_kwargs(generate_stream, kwargs)
+            for chunk in generate_stream(user_prompt, **kwargs):
+                chunks.append(chunk)
+                yield chunk
+            response = "".join(chunks)
+        else:
+            generate = self.llm_interface.generate
+            response = generate(user_prompt, **_forwarded_kwargs(generate, kwargs))
+            yield response
+        self.cache.store(content, response, context, self._cache_model, embedding)
+
+    def generate_many(
+        self, user_prompts: Sequence[str], system_prompt: str = "", **kwargs: Any
+    ) -> List[str]:
+        """
+        Generate responses to several prompts, requesting only the uncached ones concurrently.
+
+        Args:
+            user_prompts: The user prompts.
+            system_prompt: The system prompt shared by all prompts.
+            **kwargs: Extra arguments passed through to the wrapped interface.
+
+        Returns:
+            The responses of the language model, in the order of the prompts.
+        """
+        split_prompts = [
+            self._split_prompt(prompt, system_prompt, kwargs) for prompt in user_prompts
+        ]
+        lookups = [
+            self.cache.lookup(content, context, self._cache_model)
+            for content, context in split_prompts
+        ]
+        responses = [response for response, _ in lookups]
+        missing = [index for index, response in enumerate(responses) if response is None]
+        if not missing:
+            return responses
+
+        if system_prompt:
+            kwargs["system_prompt"] = system_prompt
+        prompts = [user_prompts[index] for index in missing]
+        if hasattr(self.llm_interface, "generate_many"):
+            generate_many = self.llm_interface.generate_many
+            generated = generate_many(prompts, **_forwarded_kwargs(generate_many, kwargs))
+        else:
+            generate = self.llm_interface.generate
+            kwargs = _forwarded_kwargs(generate, kwargs)
+            generated = [generate(prompt, **kwargs) for prompt in prompts]
+        for index, response in zip(missing, generated):
+            responses[index] = response
+            content, context = split_prompts[index]
+            self.cache.store(content, response, context, self._cache_model, lookups[index][1])
+        return responses
+
+    async def agenerate(self, user_prompt: str, system_prompt: str = "", **kwargs: Any) -> str:
+        """
+        Generate a response asynchronously, returning a cached one when available.
+
+        Args:
+            user_prompt: The user prompt.
+            system_prompt: The system prompt.
+            **kwargs: Extra arguments passed through to the wrapped interface.
+
+        Returns:
+            The response of the language model.
+        """
+        content, context = self._split_prompt(user_prompt, system_prompt, kwargs)
+        response, embedding = self.cache.lookup(content, context, self._cache_model)
+        if response is not None:
+            return response
+
+        if system_prompt:
+            kwargs["system_prompt"] = system_prompt
+        if hasattr(self.llm_interface, "agenerate"):
+            agenerate = self.llm_interface.agenerate
+            response = await agenerate(user_prompt, **_forwarded_kwargs(agenerate, kwargs))
+        else:
+            generate = self.llm_interface.generate
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                None,
+                functools.partial(generate, user_prompt, **_forwarded_kwargs(generate, kwargs)),
+            )
+        self.cache.store(content, response, context, self._cache_model, embedding)
+        return response
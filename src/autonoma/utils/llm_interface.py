@@ -1,19 +1,216 @@
+import asyncio
+import functools
+import importlib.util
+import inspect
+import json
+import threading
+import httpx
 import openai
 
+# HTTP/2 needs the optional h2 package; fall back to pooled HTTP/1.1 connections without it.
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+_pool_lock = threading.Lock()
+_pool_loop = None
+_pool_client = None
+
+
+def _get_pool():
+    """
+    Return the event loop and HTTP client shared by all asynchronous LLM calls.
+
+    The client's connections belong to the loop they were opened on, so a single loop runs in a
+    background thread for the lifetime of the process and every asynchronous request is
+    dispatched to it. This keeps connections alive across `asyncio.run` calls.
+
+    Returns:
+        A tuple of the background event loop and the pooled httpx.AsyncClient.
+    """
+    global _pool_loop, _pool_client
+    with _pool_lock:
+        if _pool_loop is None:
+            _pool_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                http2=_HTTP2,
+                timeout=60,
+            )
+            _pool_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_pool_loop.run_forever, name="autonoma-llm", daemon=True
+            ).start()
+        return _pool_loop, _pool_client
+
+
+def _strict_schema(node, exclude):
+    """
+    Rewrite a JSON schema into the subset accepted by OpenAI's strict structured outputs.
+
+    Every object lists all of its properties as required and allows no others, defaults are
+    dropped and single-element `allOf` wrappers (used by pydantic for referenced enums) are
+    replaced by their element.
+
+    Args:
+        node: The schema, or a part of it.
+        exclude: The names of the properties to leave out of every object.
+
+    Returns:
+        The rewritten schema.
+    """
+    if isinstance(node, list):
+        return [_strict_schema(item, exclude) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if len(node.get("allOf", ())) == 1:
+        return _strict_schema(node["allOf"][0], exclude)
+
+    strict = {
+        key: _strict_schema(value, exclude)
+        for key, value in node.items()
+        if key not in ("default", "required", "properties")
+    }
+    if "properties" in node:
+        strict["properties"] = {
+            name: _strict_schema(value, exclude)
+            for name, value in node["properties"].items()
+            if name not in exclude
+        }
+        strict["required"] = list(strict["properties"])
+        strict["additionalProperties"] = False
+    elif "required" in node:
+        strict["required"] = node["required"]
+    return strict
+
+
+@functools.lru_cache(maxsize=None)
+def json_schema_response_format(model_class, exclude=()):
+    """
+    Build a strict OpenAI `json_schema` response format constraining output to a Pydantic model.
+
+    Args:
+        model_class: The Pydantic model class the response must parse into.
+        exclude: The names of fields, at any depth, that are filled in by the application rather
+            than by the model. They must have defaults.
+
+    Returns:
+        A response_format dictionary to pass to `LLMInterface.generate`.
+    """
+    schema = model_class.schema()
+    if "definitions" in schema:
+        schema["$defs"] = schema.pop("definitions")
+    schema = json.loads(json.dumps(schema).replace('"#/definitions/', '"#/$defs/'))
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model_class.__name__,
+            "schema": _strict_schema(schema, frozenset(exclude)),
+            "strict": True,
+        },
+    }
+
+
+def accepts_response_format(method):
+    """
+    Check whether an LLM interface method takes a `response_format` argument.
+
+    Custom interfaces only need to implement `generate(user_prompt, system_prompt="")`, so the
+    response format is only passed to methods declaring it or taking arbitrary keywords.
+
+    Args:
+        method: The method of the LLM interface, e.g. its `generate`.
+
+    Returns:
+        True if the response format can be passed to the method, False otherwise.
+    """
+    return _accepts_response_format(getattr(method, "__func__", method))
+
+
+@functools.lru_cache(maxsize=None)
+def _accepts_response_format(function):
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        parameter.name == "response_format" or parameter.kind is parameter.VAR_KEYWORD
+        for parameter in parameters
+    )
+
+
+def response_format_kwargs(method, model_class, exclude=()):
+    """
+    Build the keyword arguments constraining the output of an LLM interface method to a model.
+
+    Args:
+        method: The method of the LLM interface that will be called.
+        model_class: The Pydantic model class the response must parse into.
+        exclude: The names of fields left out of the schema, see `json_schema_response_format`.
+
+    Returns:
+        The `response_format` argument, or no arguments if the method does not accept it.
+    """
+    if not accepts_response_format(method):
+        return {}
+    return {"response_format": json_schema_response_format(model_class, exclude)}
+
 
 class LLMInterface:
-    def __init__(self, api_key):
+    def __init__(self, api_key, model="gpt-4o", deterministic=False):
         self.api_key = api_key
+        self.model = model
+        # Deterministic sampling makes responses reproducible, and therefore worth caching on disk.
+        self.temperature = 0 if deterministic else 0.7
+        # A single client keeps its connections alive across calls.
+        self._client = openai.Client(api_key=api_key)
+        self._async_client = None
 
-    def generate(self, user_prompt, system_prompt=""):
-        client = openai.Client(api_key=self.api_key)
-        messages = [{"role": "user", "content": user_prompt}]
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.7,
-            response_format={"type": "json_object"},
+    def generate(self, user_prompt, system_prompt="", response_format=None):
+        # Streaming keeps the connection busy receiving tokens as they are produced; callers that
+        # can act on partial output use generate_stream directly.
+        return "".join(self.generate_stream(user_prompt, system_prompt, response_format))
+
+    def generate_stream(self, user_prompt, system_prompt="", response_format=None):
+        response = self._client.chat.completions.create(
+            stream=True, **self._request(user_prompt, system_prompt, response_format)
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def agenerate(self, user_prompt, system_prompt="", response_format=None):
+        loop, _ = _get_pool()
+        future = asyncio.run_coroutine_threadsafe(
+            self._acreate(user_prompt, system_prompt, response_format), loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def generate_many(self, user_prompts, system_prompt="", response_format=None):
+        # The requests run concurrently on the shared pool loop, so this also works from a thread
+        # that is itself running an event loop.
+        async def gather():
+            return await asyncio.gather(
+                *(self._acreate(prompt, system_prompt, response_format) for prompt in user_prompts)
+            )
+
+        loop, _ = _get_pool()
+        return list(asyncio.run_coroutine_threadsafe(gather(), loop).result())
+
+    async def _acreate(self, user_prompt, system_prompt, response_format):
+        # Runs on the shared pool loop, which is the only thread touching the async client.
+        if self._async_client is None:
+            _, http_client = _get_pool()
+            self._async_client = openai.AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+        response = await self._async_client.chat.completions.create(
+            **self._request(user_prompt, system_prompt, response_format)
         )
         return response.choices[0].message.content
+
+    def _request(self, user_prompt, system_prompt, response_format=None):
+        # The system prompt goes first so the static part of the conversation forms a stable prefix.
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": user_prompt})
+        return dict(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            response_format=response_format or {"type": "json_object"},
+        )
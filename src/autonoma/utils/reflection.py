@@ -1,20 +1,103 @@
 """Reflection utilities for the Autonoma package."""
 
-from typing import List
+import atexit
+import queue
+import sys
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple
+
+# Thoughts of all reflectors, with the log each is appended to, are written by a single thread.
+_queue: "queue.Queue[Tuple[str, Optional[TextIO]]]" = queue.Queue()
+_writer_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+
+
+def _start_writer() -> None:
+    """Start the thread writing queued thoughts, unless it is already running."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_drain, name="autonoma-reflector", daemon=True)
+            _writer.start()
+            atexit.register(_queue.join)
+
+
+def _drain() -> None:
+    """Print and log queued thoughts until the interpreter exits."""
+    while True:
+        # Write everything queued so far at once, flushing once per batch instead of per line.
+        batch = [_queue.get()]
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            logs: Dict[TextIO, List[str]] = {}
+            for thought, log in batch:
+                if log is not None:
+                    logs.setdefault(log, []).append(f"{thought}\n")
+            _write(sys.stdout, "".join(f"Reflection: {thought}\n" for thought, _ in batch))
+            for log, lines in logs.items():
+                _write(log, "".join(lines))
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _write(stream: TextIO, text: str) -> None:
+    """
+    Write and flush text, reporting rather than raising errors so the writer keeps running.
+
+    Args:
+        stream: The stream to write to.
+        text: The text to write.
+    """
+    try:
+        stream.write(text)
+        stream.flush()
+    except Exception as e:
+        try:
+            sys.stderr.write(f"Failed to write reflections: {e!r}\n")
+        except Exception:
+            pass
 
 
 class Reflector:
-    """A class to handle reflection and thought process logging."""
+    """
+    A class to handle reflection and thought process logging.
 
-    def __init__(self):
+    Thoughts are recorded immediately, while printing and logging them happens on a background
+    thread so that reflecting never blocks the agents on terminal or file I/O.
+    """
+
+    def __init__(self, log_file: Optional[str] = None):
+        """
+        Initialize the Reflector.
+
+        Args:
+            log_file: A file to append every thought to, in addition to printing it.
+
+        Raises:
+            OSError: If the log file cannot be opened.
+        """
         self.thought_process: List[str] = []
+        self.log_file = log_file
+        # Opened here so that an unusable log file fails right away. Queued thoughts keep a
+        # reference to it, so it stays open until they are written.
+        self._log: Optional[TextIO] = open(log_file, "a") if log_file else None
 
     def reflect(self, thought: str) -> None:
         """
-        Add a thought to the thought process and print it.
+        Add a thought to the thought process and queue it for printing.
 
         Args:
             thought: The thought to be added and printed.
         """
         self.thought_process.append(thought)
-        print(f"Reflection: {thought}")
+        _start_writer()
+        _queue.put_nowait((thought, self._log))
+
+    def flush(self) -> None:
+        """Wait until every queued thought has been printed and logged."""
+        _queue.join()
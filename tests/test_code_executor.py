@@ -0,0 +1,141 @@
+"""Tests for the CodeExecutor."""
+
+import os
+
+import pytest
+
+from autonoma.utils._runner import TIMEOUT_OUTPUT
+from autonoma.utils.code_executor import CodeExecutor
+
+HELPERS = {"helpers.py": "def f():\n    return 42\n"}
+
+
+@pytest.fixture
+def executor():
+    executor = CodeExecutor(timeout=1, max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_run_returns_stdout(executor):
+    result = executor.run("print('hello')", {})
+
+    assert result.success
+    assert result.output == "hello\n"
+
+
+def test_run_imports_from_codebase(executor):
+    result = executor.run("from helpers import f\nprint(f())", HELPERS)
+
+    assert result.success
+    assert result.output == "42\n"
+
+
+def test_run_reports_stderr_on_failure(executor):
+    result = executor.run("raise ValueError('boom')", {})
+
+    assert not result.success
+    assert "ValueError: boom" in result.output
+
+
+def test_run_times_out(executor):
+    result = executor.run("while True:\n    pass\n", {})
+
+    assert not result.success
+    assert result.output == TIMEOUT_OUTPUT
+    assert executor.run("print('after')", {}).output == "after\n"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs forked executions")
+def test_run_times_out_when_code_ignores_the_interrupt(executor):
+    code = (
+        "while True:\n"
+        "    try:\n"
+        "        while True:\n"
+        "            pass\n"
+        "    except BaseException:\n"
+        "        pass\n"
+    )
+
+    result = executor.run(code, {})
+
+    assert not result.success
+    assert result.output == TIMEOUT_OUTPUT
+    assert executor.run("print('after')", {}).output == "after\n"
+
+
+def test_run_survives_os_exit(executor):
+    result = executor.run("import os\nos._exit(3)", {})
+
+    assert not result.success
+    assert "3" in result.output
+    assert executor.run("print('after')", {}).output == "after\n"
+
+
+def test_run_uses_a_fresh_working_directory(executor):
+    executor.run("open('leftover.txt', 'w').close()", HELPERS)
+
+    result = executor.run("import os\nfrom helpers import f\nprint(os.listdir('.'))", HELPERS)
+
+    assert result.output == "[]\n"
+
+
+def test_analyze_imports_keeps_top_level_names_only(executor):
+    code = (
+        "import os.path\n"
+        "import numpy.linalg as la, json\n"
+        "from sklearn.model_selection import train_test_split\n"
+        "from . import sibling\n"
+        "from .package import thing\n"
+        "try: import yaml\n"
+        "x = 1; import requests\n"
+    )
+
+    assert executor.analyze_imports(code) == [
+        "os",
+        "numpy",
+        "json",
+        "sklearn",
+        "yaml",
+        "requests",
+    ]
+
+
+def test_mock_external_modules_skips_stdlib_and_codebase(executor):
+    code = "import os\nimport numpy.linalg\nfrom helpers import f\nfrom .local import g\n"
+    codebase = {"helpers.py": "import pandas\nfrom . import sibling\n"}
+
+    assert executor.mock_external_modules(code, codebase) == ["numpy", "pandas"]
+
+
+def test_run_mocks_submodules_of_external_modules(executor):
+    code = (
+        "import matplotlib.pyplot as plt\n"
+        "from sklearn.model_selection import train_test_split\n"
+        "plt.plot(train_test_split([1, 2]))\n"
+        "print('ok')\n"
+    )
+
+    result = executor.run(code, {})
+
+    assert result.success, result.output
+    assert result.mocked_modules == ["matplotlib", "sklearn"]
+
+
+def test_run_mocks_external_imports_of_the_codebase(executor):
+    codebase = {"processor.py": "import tensorflow\nfrom helpers import f\n", **HELPERS}
+
+    result = executor.run("from processor import f\nprint(f())", codebase)
+
+    assert result.success, result.output
+    assert result.mocked_modules == ["tensorflow"]
+
+
+def test_run_does_not_mock_modules_mocked_for_earlier_codebases(executor):
+    code = "from helpers import f\nassert f() == 42\n"
+
+    assert not executor.run(code, {"other.py": "x = 1\n"}).success
+    result = executor.run(code, HELPERS)
+
+    assert result.success, result.output
+    assert result.mocked_modules == []
@@ -0,0 +1,107 @@
+"""Tests for the LLM response cache."""
+
+import sqlite3
+
+import pytest
+
+from autonoma.utils import llm_cache
+from autonoma.utils.llm_cache import LLMCache
+
+
+class _Clock:
+    """Stands in for the time module so that tests can move time forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "responses.sqlite3")
+
+
+def _row_count(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LLMCache(ttl=10)
+    cache.store("prompt", "response")
+
+    clock.now += 9
+    assert cache.lookup("prompt") == ("response", None)
+    clock.now += 2
+    assert cache.lookup("prompt") == (None, None)
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_entries_without_ttl_never_expire(clock, path):
+    LLMCache(ttl=None, path=path).store("prompt", "response")
+
+    clock.now += 10**9
+    assert LLMCache(ttl=None, path=path).lookup("prompt") == ("response", None)
+
+
+def test_persisted_entries_expire_after_ttl(clock, path):
+    LLMCache(ttl=10, path=path).store("prompt", "response")
+
+    clock.now += 9
+    assert LLMCache(ttl=10, path=path).lookup("prompt") == ("response", None)
+    clock.now += 2
+    assert LLMCache(ttl=10, path=path).lookup("prompt") == (None, None)
+
+
+def test_persisted_hits_are_kept_in_memory_until_they_expire(clock, path):
+    LLMCache(ttl=10, path=path).store("prompt", "response")
+    clock.now += 5
+    cache = LLMCache(ttl=10, path=path)
+    assert cache.lookup("prompt") == ("response", None)
+
+    connection = sqlite3.connect(path)
+    connection.execute("DELETE FROM responses")
+    connection.commit()
+    connection.close()
+
+    assert cache.lookup("prompt") == ("response", None)
+    clock.now += 6
+    assert cache.lookup("prompt") == (None, None)
+
+
+def test_store_prunes_expired_rows(clock, path):
+    cache = LLMCache(ttl=10, path=path)
+    cache.store("old prompt", "response")
+    clock.now += 5
+    cache.store("recent prompt", "response")
+    assert _row_count(path) == 2
+
+    clock.now += 6
+    cache.store("new prompt", "response")
+
+    assert _row_count(path) == 2
+    assert LLMCache(ttl=None, path=path).lookup("old prompt") == (None, None)
+
+
+def test_entries_are_scoped_by_system_prompt_and_model():
+    cache = LLMCache()
+    cache.store("prompt", "response", system_prompt="system", model="model")
+
+    assert cache.lookup("prompt", "system", "model") == ("response", None)
+    assert cache.lookup("prompt", "other system", "model") == (None, None)
+    assert cache.lookup("prompt", "system", "other model") == (None, None)
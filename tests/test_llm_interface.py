@@ -0,0 +1,110 @@
+"""Tests for the strict JSON schema response formats."""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from autonoma.utils.llm_interface import accepts_response_format, json_schema_response_format
+
+
+class Inner(BaseModel):
+    name: str
+    note: Optional[str] = None
+
+
+class Outer(BaseModel):
+    inner: Inner
+    items: List[Inner] = Field(default_factory=list)
+    status: str = "new"
+    label: Optional[str] = None
+
+
+def _objects(node):
+    """Yield every JSON schema object with properties, at any depth."""
+    if isinstance(node, dict):
+        if "properties" in node:
+            yield node
+        for value in node.values():
+            yield from _objects(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _objects(value)
+
+
+def _values(node, key):
+    """Yield the values of a key anywhere in a JSON schema."""
+    if isinstance(node, dict):
+        if key in node:
+            yield node[key]
+        for value in node.values():
+            yield from _values(value, key)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _values(value, key)
+
+
+def test_response_format_is_strict():
+    response_format = json_schema_response_format(Outer)
+
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "Outer"
+    assert response_format["json_schema"]["strict"] is True
+
+
+def test_every_property_is_required_and_no_other_is_allowed():
+    schema = json_schema_response_format(Outer)["json_schema"]["schema"]
+
+    objects = list(_objects(schema))
+    assert len(objects) == 2
+    for node in objects:
+        assert node["required"] == list(node["properties"])
+        assert node["additionalProperties"] is False
+
+
+def test_optional_fields_are_required_with_their_type():
+    schema = json_schema_response_format(Outer)["json_schema"]["schema"]
+
+    assert "label" in schema["required"]
+    assert schema["properties"]["label"]["type"] == "string"
+    assert "note" in schema["$defs"]["Inner"]["required"]
+
+
+def test_defaults_are_dropped():
+    schema = json_schema_response_format(Outer)["json_schema"]["schema"]
+
+    assert not list(_values(schema, "default"))
+
+
+def test_nested_models_reference_defs():
+    schema = json_schema_response_format(Outer)["json_schema"]["schema"]
+
+    assert "definitions" not in schema
+    assert set(_values(schema, "$ref")) == {"#/$defs/Inner"}
+    assert schema["properties"]["items"]["items"] == {"$ref": "#/$defs/Inner"}
+
+
+def test_excluded_fields_are_removed_at_any_depth():
+    schema = json_schema_response_format(Outer, ("status", "note"))["json_schema"]["schema"]
+
+    assert "status" not in schema["properties"]
+    assert "status" not in schema["required"]
+    assert list(schema["$defs"]["Inner"]["properties"]) == ["name"]
+    assert schema["$defs"]["Inner"]["required"] == ["name"]
+
+
+def test_accepts_response_format():
+    class Custom:
+        def generate(self, user_prompt, system_prompt=""):
+            return ""
+
+    class WithFormat:
+        def generate(self, user_prompt, system_prompt="", response_format=None):
+            return ""
+
+    class WithKeywords:
+        def generate(self, user_prompt, **kwargs):
+            return ""
+
+    assert not accepts_response_format(Custom().generate)
+    assert accepts_response_format(WithFormat().generate)
+    assert accepts_response_format(WithKeywords().generate)